@@ -19,10 +19,13 @@ import datetime
 from oled import OLED
 from expansion import Expansion
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fase2dashboard"))
+from core.cpu_stats import CpuStats
+
 class Pi_Monitor:
     __slots__ = ['oled', 'expansion', 'font_size', 'cleanup_done', 
                  'stop_event', '_fan_pwm_path', '_format_strings',
-                 'convert_to_fahrenheit']
+                 'convert_to_fahrenheit', '_cpu_stats']
 
     def __init__(self):
         # Initialize OLED and Expansion objects
@@ -35,6 +38,9 @@ class Pi_Monitor:
         
         # Cache hwmon path lookup for performance
         self._fan_pwm_path = None
+
+        # Shared /proc/stat accounting (consistent deltas for every reader)
+        self._cpu_stats = CpuStats()
         
         # Pre-allocate format strings
         temp_unit = "℉" if self.convert_to_fahrenheit else "℃"
@@ -111,9 +117,9 @@ class Pi_Monitor:
         return -1
 
     def get_raspberry_cpu_usage(self):
-        """Get the CPU usage percentage"""
+        """Get the CPU usage percentage from the shared /proc/stat accounting"""
         try:
-            return psutil.cpu_percent(interval=0)
+            return round(self._cpu_stats.percent(), 1)
         except Exception:
             return 0
 
@@ -1,19 +1,40 @@
+import math
 import time
 import psutil
 import subprocess
 from PIL import Image, ImageDraw, ImageFont
-import os
 import sys
 sys.path.append("/home/jalivur/Documents/proyectopantallas")
+sys.path.append("/home/jalivur/Documents/proyectopantallas/fase2dashboard")
 from Code.expansion import Expansion
 from Code.oled import OLED
-import json
+from core.thermal_sensor import ThermalSensor
+from core.job_scheduler import JobScheduler
+from core.cpu_stats import CpuStats
+from core.metrics_bus import MetricsBusWriter
+from core.cpu_throttle import CpuThrottle, throttle_level
+from core.control_channel import ControlServer
+from core.file_watch import FileWatcher
+from core.state_store import runtime_store, config_store, FAN_STATE, LED_STATE, HW_STATE, FAN_CURVE
+from core.curve_logic import CurveLogic
+from services.disk_service import DiskService
+from config.settings import (
+    HW_STATE_PERIOD, FAN_TRACE_FILE, FAN_MODE_PWM, FAN_VERIFY_PERIOD, FAN_NO_TEMP_PWM, CONTROL_SOCKET,
+)
+from core.fan_controller import PidFanController, DutyPlanner, LoadFeedForward
+from core.fan_sim import TraceRecorder
+from core.fan_verify import FanVerifier, FanTach
+from core.led_effects import LedEffectEngine, EFFECTS, parse_params
+from collections import deque
 import signal
 
-# ── Rutas de estado ──────────────────────────────────────────────────────────
-STATE_FILE    = "/home/jalivur/Documents/system_dashboard/data/fan_state.json"
-LED_FILE      = "/home/jalivur/Documents/system_dashboard/data/led_state.json"      # NUEVO
-HW_FILE       = "/home/jalivur/Documents/system_dashboard/data/hardware_state.json" # NUEVO
+# ── Almacenes de estado ──────────────────────────────────────────────────────
+# fan_state / led_state / hardware_state en tmpfs (mismo directorio que usa el
+# dashboard); al salir se copia el último estado a disco y al arrancar tras un
+# reinicio se recupera de ahí.
+state_store  = runtime_store()
+config_disk  = config_store()
+state_store.seed_from(config_disk)
 
 # ── Señales ───────────────────────────────────────────────────────────────────
 stop_flag = False
@@ -31,33 +52,51 @@ board = Expansion()
 oled  = OLED()
 oled.clear()
 font  = ImageFont.load_default()
+thermal_sensor = ThermalSensor()   # sysfs con pread; vcgencmd solo como fallback
+cpu_stats      = CpuStats()        # /proc/stat compartido por todos los consumidores
+metrics_bus    = MetricsBusWriter() # memoria compartida que lee el dashboard
+cpu_throttle   = CpuThrottle()      # scaling_cur_freq + get_throttled del firmware
 
 # ── Estado de rotación de IPs ─────────────────────────────────────────────────
 _ip_list       = []   # [(iface, ip), ...]
 _ip_index      = 0
-_ip_last_rot   = 0
-_IP_ROT_S      = 3    # segundos entre rotaciones
+
+# ── Periodos de las tareas (segundos) ─────────────────────────────────────────
+TEMP_PERIOD_S   = 1     # temperatura + ventiladores + LEDs + OLED
+IPS_PERIOD_S    = 20    # refresco de IPs
+STATE_PERIOD_S  = 1     # fan_state.json / led_state.json (solo escritores sin socket)
+HW_PERIOD_S     = HW_STATE_PERIOD   # hardware_state.json (el dashboard lo da por caducado a 3x)
+FAN_VERIFY_S    = FAN_VERIFY_PERIOD # duty leído frente al pedido + tacómetro
+LED_IDLE_S      = 60    # tick de efectos LED sin efecto activo (con efecto: 1/fps)
+_IP_ROT_S       = 3     # segundos entre rotaciones de IP en el OLED
 
 
 # ── Funciones de lectura de JSON ─────────────────────────────────────────────
+# Vigilados con inotify (o stat si no hay): solo se parsean cuando cambian,
+# el resto de lecturas devuelven el objeto cacheado.
+file_watcher = FileWatcher()
+_fan_state_file = state_store.watch(file_watcher, FAN_STATE)
+_led_state_file = state_store.watch(file_watcher, LED_STATE)
+
 def read_fan_state():
-    if not os.path.exists(STATE_FILE):
-        return None
-    try:
-        with open(STATE_FILE) as f:
-            return json.load(f)
-    except:
-        return None
+    return _fan_state_file.get()
 
 def read_led_state():                          # NUEVO
     """Lee led_state.json. Devuelve None si no existe."""
-    if not os.path.exists(LED_FILE):
-        return None
+    return _led_state_file.get()
+
+# Curvas del usuario (fan_curve.json): se evalúan aquí en cada tick, así el
+# modo auto no depende de que el dashboard esté abierto. Solo se recompilan
+# cuando el fichero cambia.
+curve_logic  = CurveLogic(watcher=file_watcher, path=config_disk.path(FAN_CURVE))
+disk_service = DiskService()   # solo se lee si la curva de fan1 usa la NVMe
+
+def persist_state(name, data):
+    """Guarda el último estado conocido (fan/led) para el dashboard y el siguiente arranque."""
     try:
-        with open(LED_FILE) as f:
-            return json.load(f)
-    except:
-        return None
+        state_store.write(name, data)
+    except Exception as e:
+        print(f"[fase1] Error guardando {name}: {e}")
 
 def write_hardware_state(chassis_temp, fan0_pct, fan1_pct):  # NUEVO
     """Escribe en hardware_state.json para que el dashboard lo lea."""
@@ -65,25 +104,33 @@ def write_hardware_state(chassis_temp, fan0_pct, fan1_pct):  # NUEVO
         "chassis_temp": chassis_temp,
         "fan0_pct":     fan0_pct,
         "fan1_pct":     fan1_pct,
-        "ts":           time.time()
+        "ts":           time.time(),
+        # Tráfico I2C de ventiladores: escrituras reales frente a cambios de objetivo
+        "duty_writes":         duty_planner.writes + duty_planner1.writes,
+        "duty_target_changes": duty_planner.target_changes + duty_planner1.target_changes,
+        # Tráfico I2C de los efectos LED (media de los últimos segundos)
+        "led_writes_per_s":    round(led_engine.writes_per_s(), 1),
+        # Fallo de refrigeración detectado (None si todo va bien)
+        "fan_fault":           "; ".join(fan_verifier.tripped) if fan_failsafe else None,
     }
     try:
-        tmp = HW_FILE + ".tmp"
-        with open(tmp, "w") as f:
-            json.dump(data, f)
-        os.replace(tmp, HW_FILE)   # escritura atómica
+        state_store.write(HW_STATE, data)   # escritura atómica en tmpfs
     except Exception as e:
         print(f"[fase1] Error escribiendo hardware_state: {e}")
 
 # ── Funciones de hardware ─────────────────────────────────────────────────────
-def get_cpu_temp():
-    temp = subprocess.check_output(["vcgencmd", "measure_temp"]).decode()
-    return float(temp.replace("temp=", "").replace("'C\n", ""))
+_temp_failed = False
 
-def fan_curve(temp):
-    if temp < 40:   return 40
-    elif temp > 75: return 255
-    else:           return int((temp - 40) * (215 / 35) + 40)
+def get_cpu_temp():
+    """Temperatura de CPU, o None si no responde ninguna fuente (se avisa una vez)."""
+    global _temp_failed
+    temp = thermal_sensor.read(default=None)
+    if temp is None and not _temp_failed:
+        print(f"[fase1] Sin lectura de temperatura de CPU: auto/pid a PWM {FAN_NO_TEMP_PWM} hasta que vuelva")
+    elif temp is not None and _temp_failed:
+        print("[fase1] Lectura de temperatura de CPU recuperada")
+    _temp_failed = temp is None
+    return temp
 
 def temp_to_color(temp):
     if temp < 40:   return (0, 255, 0)
@@ -161,6 +208,20 @@ _last_led_applied = {
     "b":    None,
 }
 
+# Efectos por LED calculados aquí ("mode": "effect"): job_led_effects los
+# renderiza a los FPS pedidos y solo escribe los LEDs que cambian
+led_engine = LedEffectEngine(board)
+
+def apply_led_effect(led_state):
+    """Activa o cambia el efecto del host; el firmware queda en RGB fijo para no pisarlo."""
+    if _last_led_applied["mode"] != "effect":
+        board.set_led_mode(1)
+        led_engine.invalidate()
+    if led_engine.configure(led_state):
+        scheduler.set_period("led_effects", 1.0 / led_engine.fps if led_engine.active else LED_IDLE_S)
+    # Sin color aplicado: al salir del efecto el siguiente modo siempre escribe
+    _last_led_applied.update(mode="effect", r=None, g=None, b=None)
+
 def apply_led_state(led_state, cpu_temp, current_color):
     """
     Aplica el estado de LEDs solo si algo ha cambiado desde la última vez.
@@ -171,6 +232,13 @@ def apply_led_state(led_state, cpu_temp, current_color):
     """
     global _last_led_applied
 
+    if led_state is not None and led_state.get("mode") == "effect":
+        apply_led_effect(led_state)
+        return current_color
+    if led_engine.active:
+        led_engine.stop()
+        scheduler.set_period("led_effects", LED_IDLE_S)
+
     # ── Determinar modo y color deseados ─────────────────────────────────────
     if led_state is None or led_state.get("mode", "auto") == "auto":
         # Modo auto: smooth del color hacia temp_to_color
@@ -265,17 +333,32 @@ def apply_led_state(led_state, cpu_temp, current_color):
 last_oled_state = {
     "cpu": None, "ram": None, "temp": None,
     "ip": None, "tun_ip": None,
-    "fan0_duty": None, "fan1_duty": None
+    "fan0_duty": None, "fan1_duty": None,
+    "freq": None, "throttle": None
 }
 
-def draw_oled_smart(cpu, ram, temp, ip, fan0_duty, fan1_duty):
+# Mini gráfica de frecuencia en la esquina superior derecha del OLED
+_SPARK_X, _SPARK_W, _SPARK_H = 88, 40, 22
+_freq_hist = deque([0.0] * _SPARK_W, maxlen=_SPARK_W)
+_THROTTLE_TAGS = {1: "CAP", 2: "THR", 3: "UV"}
+
+def draw_freq_sparkline():
+    max_mhz = cpu_throttle.max_mhz or max(max(_freq_hist), 1.0)
+    for i, mhz in enumerate(_freq_hist):
+        h = int(min(mhz / max_mhz, 1.0) * _SPARK_H)
+        if h:
+            oled.draw_line((_SPARK_X + i, _SPARK_H, _SPARK_X + i, _SPARK_H - h), fill="white")
+
+def draw_oled_smart(cpu, ram, temp, ip, fan0_duty, fan1_duty, freq=0.0, throttle=0):
     changed = (
         round(cpu, 1)  != last_oled_state["cpu"]      or
         round(ram, 1)  != last_oled_state["ram"]      or
         int(temp)      != last_oled_state["temp"]     or
         ip             != last_oled_state["ip"]       or
         fan0_duty      != last_oled_state["fan0_duty"] or
-        fan1_duty      != last_oled_state["fan1_duty"]
+        fan1_duty      != last_oled_state["fan1_duty"] or
+        int(freq)      != last_oled_state["freq"]     or
+        throttle       != last_oled_state["throttle"]
     )
     if not changed:
         return
@@ -284,6 +367,9 @@ def draw_oled_smart(cpu, ram, temp, ip, fan0_duty, fan1_duty):
     oled.draw_text(f"CPU: {cpu:>5.1f} %",   (0, 0))
     oled.draw_text(f"RAM: {ram:>5.1f} %",   (0, 12))
     oled.draw_text(f"TEMP:{temp:>5.1f} C",  (0, 24))
+    draw_freq_sparkline()
+    if throttle:
+        oled.draw_text(_THROTTLE_TAGS[throttle], (_SPARK_X + 8, 24))
     if _ip_list:
         iface, ip = _ip_list[_ip_index]
         # Abreviar nombre interfaz para que quepa: wlan0→w0, eth0→e0, tun0→t0
@@ -297,101 +383,350 @@ def draw_oled_smart(cpu, ram, temp, ip, fan0_duty, fan1_duty):
     last_oled_state.update({
         "cpu": round(cpu, 1), "ram": round(ram, 1),
         "temp": int(temp), "ip": ip,
-        "fan0_duty": fan0_duty, "fan1_duty": fan1_duty
+        "fan0_duty": fan0_duty, "fan1_duty": fan1_duty,
+        "freq": int(freq), "throttle": throttle
     })
 
+# ── Estado compartido entre tareas ────────────────────────────────────────────
+current_color   = (0, 255, 0)
+last_pwm        = None
+last_pwm1       = None
+last_temp       = None
+last_state_file = None
+last_led_file   = None
+last_cpu        = 0.0
+last_ram        = 0.0
+last_chassis    = 0
+last_real_fan0  = 0
+last_real_fan1  = 0
+last_freq       = 0.0
+last_throttle   = 0
+
+def current_ip():
+    """(iface, ip) que se muestra ahora mismo en el OLED, o None."""
+    if _ip_list:
+        return _ip_list[_ip_index]
+    return None
+
+def refresh_oled():
+    fan0_percent = int(last_pwm * 100 / 255) if last_pwm is not None else 0
+    fan1_percent = int(last_pwm1 * 100 / 255) if last_pwm1 is not None else 0
+    draw_oled_smart(last_cpu, last_ram, last_temp or 0.0, current_ip(), fan0_percent, fan1_percent,
+                    last_freq, last_throttle)
+
+# Modo "pid": un paso de control por tick de job_temp (dt fijo = TEMP_PERIOD_S)
+pid_controller = PidFanController(dt=TEMP_PERIOD_S)
+# Banda muerta + rampa + hold antes de escribir el duty por I2C, uno por
+# ventilador: fan0 (disipador) y fan1 (caja) pueden llevar curvas distintas
+duty_planner  = DutyPlanner()
+duty_planner1 = DutyPlanner()
+# Extra de PWM cuando la carga de CPU sube (la temperatura llega después)
+feed_forward = LoadFeedForward()
+# Modos en los que manda la temperatura y se suma el feed-forward
+_FF_MODES = ("auto", "pid")
+# Verificación en lazo cerrado: si falla, la placa vuelve a su modo automático
+fan_verifier = FanVerifier()
+fan_tach     = FanTach()
+fan_failsafe = False
+# Grabación opcional de trazas para el simulador offline
+trace_recorder = TraceRecorder(FAN_TRACE_FILE) if FAN_TRACE_FILE else None
+_last_fan_mode = None
+
+def fan_sensor_temps():
+    """Temperatura de cada sensor que puede alimentar una curva (None = sin lectura)."""
+    temps = {
+        "cpu":     last_temp if last_temp is not None else get_cpu_temp(),
+        "chassis": last_chassis or None,   # lo refresca job_hardware_state
+        "nvme":    None,
+    }
+    if curve_logic.has_own_curve("fan1") and curve_logic.sensor("fan1") == "nvme":
+        temps["nvme"] = disk_service.get_temp() or None
+    return temps
+
+def apply_fans(step=False, immediate=False):
+    """
+    Calcula y aplica el PWM de cada ventilador según el modo de last_state_file.
+    `step` solo lo pasa job_temp: avanza el PID un tick. `immediate` (orden
+    del dashboard) salta banda muerta y rampa.
+
+    auto evalúa aquí las curvas de fan_curve.json; pid controla fan0 y deja
+    a fan1 con su curva propia. En manual y los modos fijos, y si fan1 no
+    tiene curva propia, fan1 sigue a fan0. Si no hay temperatura de CPU,
+    auto y pid van a FAN_NO_TEMP_PWM en lugar de leer 0 °C.
+    """
+    global last_pwm, last_pwm1, _last_fan_mode
+    if fan_failsafe:
+        return   # manda la placa hasta que el dashboard vuelva a dar una orden
+    state = last_state_file or {}
+    mode = state.get("mode")
+    manual_pwm = state.get("target_pwm")
+    if mode == "manual" and not isinstance(manual_pwm, (int, float)):
+        mode = "auto"
+    elif mode not in ("pid", "manual") and mode not in FAN_MODE_PWM:
+        mode = "auto"
+    if step:
+        feed_forward.update(last_cpu)
+    temps = fan_sensor_temps()
+    cpu_temp = temps["cpu"]
+    curve0, curve1 = curve_logic.compute_fan_pwms(temps) if cpu_temp is not None else (None, None)
+    if cpu_temp is None and mode in ("auto", "pid"):
+        # Sin temperatura de CPU no hay curva ni PID que seguir: a lo seguro
+        fan_pwm = FAN_NO_TEMP_PWM
+    elif mode == "pid":
+        if _last_fan_mode != "pid":
+            # Entrada al modo sin salto: el integrador parte del PWM actual
+            pid_controller.reset(output=last_pwm)
+        setpoint = state.get("setpoint")
+        if isinstance(setpoint, (int, float)):
+            pid_controller.setpoint = float(setpoint)
+        if step or pid_controller.output is None:
+            pid_controller.update(cpu_temp)
+        fan_pwm = pid_controller.output
+    elif mode == "manual":
+        fan_pwm = manual_pwm
+    elif mode in FAN_MODE_PWM:
+        fan_pwm = FAN_MODE_PWM[mode]
+    else:
+        fan_pwm = curve0
+    # Al volver la temperatura el PID arranca de nuevo desde el PWM actual
+    _last_fan_mode = mode if cpu_temp is not None else None
+    if mode in _FF_MODES:
+        # El adelanto por carga es cosa de la CPU: solo fan0 (y fan1 si la sigue)
+        fan_pwm = feed_forward.apply(fan_pwm)
+    fan1_pwm = curve1 if mode in ("auto", "pid") and curve1 is not None else fan_pwm
+    duty0 = duty_planner.plan(fan_pwm, immediate=immediate)
+    duty1 = duty_planner1.plan(fan1_pwm, immediate=immediate)
+    if duty0 is not None or duty1 is not None:
+        # Una sola escritura con los dos duties; el que no cambia se repite.
+        # Si falla, job_fan_verify lo verá como duty no aplicado.
+        try:
+            board.set_fan_duty(duty_planner.current, duty_planner1.current)
+        except Exception as e:
+            print(f"[fase1] Error escribiendo duty: {e}")
+        last_pwm, last_pwm1 = duty_planner.current, duty_planner1.current
+
+def enter_fan_failsafe(faults):
+    """Alerta y devuelve los ventiladores al modo automático del firmware de la placa."""
+    global fan_failsafe
+    fan_failsafe = True
+    print(f"[fase1] ALERTA ventiladores: {'; '.join(faults)}. Pasando a modo automático de la placa")
+    try:
+        board.set_fan_mode(2)
+    except Exception as e:
+        print(f"[fase1] Error pasando a modo automático: {e}")
+    write_hardware_state(last_chassis, last_real_fan0, last_real_fan1)
+
+def leave_fan_failsafe():
+    """Nueva orden del dashboard: se vuelve a controlar desde aquí."""
+    global fan_failsafe, _last_fan_mode
+    try:
+        board.set_fan_mode(1)
+    except Exception as e:
+        print(f"[fase1] Error volviendo a modo manual: {e}")
+        return
+    fan_failsafe = False
+    fan_verifier.reset()
+    duty_planner.reset()
+    duty_planner1.reset()
+    _last_fan_mode = None   # el PID arranca de cero
+
+# ── Canal de control ──────────────────────────────────────────────────────────
+# Las órdenes del dashboard llegan por el socket y se aplican al momento; los
+# JSON quedan solo como último estado conocido para el siguiente arranque.
+# Antes de tocar nada se comprueba la orden: un valor malo que llegara a
+# last_state_file / last_led_file haría fallar job_temp en cada tick.
+def _is_number(value, low=None, high=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return False
+    return (low is None or value >= low) and (high is None or value <= high)
+
+def check_fan_state(data):
+    """Motivo por el que una orden de ventiladores no vale, o None si se puede aplicar."""
+    mode = data.get("mode", "auto")
+    if mode not in ("auto", "pid", "manual") and mode not in FAN_MODE_PWM:
+        return f"modo {mode!r} desconocido"
+    pwm = data.get("target_pwm")
+    if (mode == "manual" or pwm is not None) and not _is_number(pwm, 0, 255):
+        return f"target_pwm {pwm!r} no es un PWM 0-255"
+    setpoint = data.get("setpoint")
+    if setpoint is not None and not _is_number(setpoint, 0, 100):
+        return f"setpoint {setpoint!r} no es una temperatura válida"
+    return None
+
+def check_led_state(data):
+    """Motivo por el que una orden de LEDs no vale, o None si se puede aplicar."""
+    mode = data.get("mode", "auto")
+    if mode == "effect":
+        name = data.get("effect")
+        if name not in EFFECTS:
+            return f"efecto {name!r} desconocido"
+        fps = data.get("fps")
+        if fps is not None and not _is_number(fps, 0):
+            return f"fps {fps!r} no es un número"
+        try:
+            parse_params(name, data)
+        except ValueError as e:
+            return str(e)
+        return None
+    if mode != "auto" and mode not in _LED_MODE_MAP:
+        return f"modo {mode!r} desconocido"
+    for key in "rgb":
+        value = data.get(key)
+        if value is not None and not _is_number(value, 0, 255):
+            return f"{key}={value!r} no es un color 0-255"
+    return None
+
+_COMMAND_CHECKS = {"fan": check_fan_state, "led": check_led_state}
+
+def on_control_command(topic, data):
+    global last_state_file, last_led_file, current_color
+    check = _COMMAND_CHECKS.get(topic)
+    if check is None:
+        return
+    error = check(data)
+    if error:
+        print(f"[fase1] Orden {topic} rechazada: {error}")
+        return
+    if topic == "fan":
+        last_state_file = data
+        if fan_failsafe:
+            leave_fan_failsafe()
+        apply_fans(immediate=True)
+        persist_state(FAN_STATE, data)
+    elif topic == "led":
+        last_led_file = data
+        current_color = apply_led_state(last_led_file, last_temp or 0.0, current_color)
+        persist_state(LED_STATE, data)
+    control_server.publish(topic, data)
+
+control_server = ControlServer(on_control_command, CONTROL_SOCKET)
+
+# ── Tareas periódicas ─────────────────────────────────────────────────────────
+def job_state_files():
+    """fan_state.json y led_state.json (cada 1s, para escritores sin socket; casi siempre caché)."""
+    global last_state_file, last_led_file
+    last_state_file = read_fan_state()
+    last_led_file   = read_led_state()
+    control_server.publish("fan", last_state_file or {"mode": "auto", "target_pwm": None})
+    control_server.publish("led", last_led_file or {"mode": "auto"})
+
+def job_temp():
+    """Tick de control (cada 1s): temperatura, ventiladores, LEDs y OLED."""
+    global last_temp, last_cpu, last_ram, current_color, last_freq, last_throttle
+    last_temp = get_cpu_temp()
+    last_cpu  = cpu_stats.percent()
+    last_ram  = psutil.virtual_memory().percent
+
+    # ── Frecuencia y throttling ──
+    freqs         = cpu_throttle.read_freqs()
+    last_freq     = max(freqs) if freqs else 0.0
+    last_throttle = throttle_level(cpu_throttle.read_throttled())
+    _freq_hist.append(last_freq)
+
+    # ── Fans ──
+    apply_fans(step=True)
+    if trace_recorder and last_temp is not None:
+        trace_recorder.record(time.monotonic(), last_cpu, last_temp, last_pwm)
+
+    # ── LEDs ──
+    current_color = apply_led_state(last_led_file, last_temp or 0.0, current_color)
+
+    # ── OLED ──
+    refresh_oled()
+
+    # ── Bus de métricas compartido ──
+    metrics_bus.publish(
+        cpu_stats.total, cpu_stats.cores, last_ram, last_temp or 0.0,
+        chassis_temp=last_chassis,
+        fan0_pwm=last_pwm, fan1_pwm=last_pwm1,
+        fan0_real=last_real_fan0, fan1_real=last_real_fan1,
+        led_mode=_last_led_applied["mode"],
+        led_rgb=current_color,
+    )
+
+def job_ips():
+    """Lista de IPs (cada 20s)."""
+    global _ip_list, _ip_index
+    _ip_list = get_all_ips()
+    if _ip_index >= len(_ip_list):
+        _ip_index = 0
+
+def job_rotate_ip():
+    """Rotación de la IP mostrada en el OLED (cada 3s)."""
+    global _ip_index
+    if len(_ip_list) > 1:
+        _ip_index = (_ip_index + 1) % len(_ip_list)
+        refresh_oled()
+
+def job_led_effects():
+    """Un frame del efecto LED activo (cada 1/fps; sin efecto no hace nada)."""
+    led_engine.tick({"temp": last_temp, "cpu": last_cpu})
+
+def job_fan_verify():
+    """Duty leído frente al pedido y tacómetro del ventilador de la Pi (cada 2s)."""
+    global last_real_fan0, last_real_fan1
+    try:
+        read0, read1 = board.get_fan0_duty(), board.get_fan1_duty()
+        last_real_fan0 = int(read0 * 100 / 255)
+        last_real_fan1 = int(read1 * 100 / 255)
+    except Exception:
+        read0 = read1 = None
+    if fan_failsafe:
+        return
+    faults = fan_verifier.check((duty_planner.current, duty_planner1.current), read0, read1, fan_tach.read())
+    if faults:
+        enter_fan_failsafe(faults)
+
+def job_hardware_state():
+    """hardware_state.json (cada 5s). El duty real lo lee job_fan_verify."""
+    global last_chassis
+    try:
+        chassis_temp = board.get_temp()
+    except Exception:
+        chassis_temp = 0
+    write_hardware_state(chassis_temp, last_real_fan0, last_real_fan1)
+    last_chassis = chassis_temp
+
 # ── Bucle principal ───────────────────────────────────────────────────────────
+# Cada tarea se registra con su periodo; el planificador duerme exactamente
+# hasta el siguiente vencimiento en lugar de despertar cada 0.5 s. Mientras
+# espera atiende el socket de control.
+scheduler = JobScheduler()
+scheduler.add_job("ips",            IPS_PERIOD_S,   job_ips)
+scheduler.add_job("state_files",    STATE_PERIOD_S, job_state_files)
+scheduler.add_job("temp",           TEMP_PERIOD_S,  job_temp)
+scheduler.add_job("fan_verify",     FAN_VERIFY_S,   job_fan_verify,     first_delay=FAN_VERIFY_S)
+scheduler.add_job("led_effects",    LED_IDLE_S,     job_led_effects,    first_delay=LED_IDLE_S)
+scheduler.add_job("hardware_state", HW_PERIOD_S,    job_hardware_state, first_delay=HW_PERIOD_S)
+scheduler.add_job("oled_rotation",  _IP_ROT_S,      job_rotate_ip,      first_delay=_IP_ROT_S)
+
 try:
     board.set_fan_mode(1)   # Manual
     board.set_led_mode(1)   # RGB fijo (modo inicial, luego apply_led_state lo gestiona)
-    current_color = (0, 255, 0)
-
-    last_pwm         = None
-    last_ip          = None
-    last_tun_ip      = "No IP"
-    last_ip_time     = 0
-    last_state_file  = None
-    last_state_time  = 0
-    last_temp        = None
-    last_temp_time   = 0
-    last_led_file    = None
-    last_led_time    = 0
-    last_hw_time     = 0    # NUEVO: cuándo escribimos hardware_state por última vez
-
-    while not stop_flag:
-        now = time.time()
-        cpu = psutil.cpu_percent()
-        ram = psutil.virtual_memory().percent
-
-        # ── Temperatura CPU (cada 1s) ──
-        if now - last_temp_time > 1:
-            last_temp      = get_cpu_temp()
-            last_temp_time = now
-        temp = last_temp
-
-        # ── IPs (cada 20s) ──
-        if now - last_ip_time > 20:
-            _ip_list     = get_all_ips()
-            last_ip_time = now
-        ip = last_ip_time
-        # ── Rotación de IP en OLED ──
-        if now - _ip_last_rot > _IP_ROT_S and _ip_list:
-            _ip_index    = (_ip_index + 1) % len(_ip_list)
-            _ip_last_rot = now
-
-        # ── fan_state.json (cada 1s) ──
-        if now - last_state_time > 1:
-            last_state_file  = read_fan_state()
-            last_state_time  = now
-        state = last_state_file
-
-        # ── led_state.json (cada 1s) ── NUEVO
-        if now - last_led_time > 1:
-            last_led_file = read_led_state()
-            last_led_time = now
-
-        # ── Fans ──
-        fan_pwm = None
-        if state:
-            mode = state.get("mode")
-            if mode in ("manual", "auto", "silent", "normal", "performance"):
-                fan_pwm = state.get("target_pwm")
-        if fan_pwm is None:
-            fan_pwm = fan_curve(temp)
-        if fan_pwm != last_pwm:
-            board.set_fan_duty(fan_pwm, fan_pwm)
-            last_pwm = fan_pwm
-
-        fan_percent = int(last_pwm * 100 / 255)
-        fan0_duty   = fan_percent
-        fan1_duty   = fan_percent
-
-        # ── LEDs ── NUEVO: delegar a apply_led_state
-        current_color = apply_led_state(last_led_file, temp, current_color)
-
-        # ── hardware_state.json (cada 5s) ── NUEVO
-        if now - last_hw_time > 5:
-            try:
-                chassis_temp = board.get_temp()
-                real_fan0    = int(board.get_fan0_duty() * 100 / 255)
-                real_fan1    = int(board.get_fan1_duty() * 100 / 255)
-            except Exception:
-                chassis_temp = 0
-                real_fan0    = fan0_duty
-                real_fan1    = fan1_duty
-            write_hardware_state(chassis_temp, real_fan0, real_fan1)
-            last_hw_time = now
-
-        # ── OLED ──
-        draw_oled_smart(cpu, ram, temp, ip, fan0_duty, fan1_duty)
-
-        time.sleep(0.5)
+
+    scheduler.run(lambda: stop_flag, wait=control_server.poll)
 
 except KeyboardInterrupt:
     print("Salida limpia")
 except Exception as e:
     print(f"Unexpected error: {e}")
 finally:
+    for name, st in scheduler.stats().items():
+        print(f"[fase1] {name}: {st['runs']} ejecuciones, {st['overruns']} overruns")
+    print(f"[fase1] Escrituras de duty: fan0 {duty_planner.writes}, fan1 {duty_planner1.writes} "
+          f"(sin planificador habrían sido {duty_planner.target_changes} y {duty_planner1.target_changes})")
+    print(f"[fase1] Efectos LED: {led_engine.frames} frames, {led_engine.writes} escrituras "
+          f"({led_engine.frames_unchanged} sin cambios, {led_engine.frames_skipped} saltados por tope de bus)")
+    print(f"[fase1] Verificación de ventiladores: {fan_verifier.checks} comprobaciones, "
+          f"{fan_verifier.suspects} con discrepancias, fallo: {fan_verifier.tripped or 'no'}")
+    print(f"[fase1] Recargas ({file_watcher.backend}): fan_state {_fan_state_file.reloads}, "
+          f"led_state {_led_state_file.reloads}, fan_curve {curve_logic.reloads}")
     oled.clear()
+    control_server.close()
+    file_watcher.close()
+    if trace_recorder:
+        trace_recorder.flush()
+    state_store.persist_to(config_disk)
+    metrics_bus.close()
     board.set_all_led_color(0, 0, 0)
-    board.set_fan_duty(0, 0)
\ No newline at end of file
+    board.set_fan_duty(0, 0)
@@ -9,7 +9,12 @@ import socket
 import logging
 import threading
 import re
+import sys
 from functools import partial
+sys.path.append("/home/jalivur/Documents/proyectopantallas/fase2dashboard")
+from core.thermal_sensor import ThermalSensor
+from core.cpu_stats import CpuStats
+from core.curve_logic import CompiledCurve
 
 
 # -----------------------------
@@ -236,29 +241,31 @@ def load_curve():
     except:
         return [{"temp":40,"pwm":100},{"temp":50,"pwm":100},{"temp":60,"pwm":100},{"temp":70,"pwm":63},{"temp":80,"pwm":81}]
 
+# Curva compilada (tabla densa); solo se reconstruye si cambia el inode o el mtime
+_compiled_curve=None
+_compiled_curve_key=None
+
+def compiled_curve():
+    global _compiled_curve,_compiled_curve_key
+    try:
+        st=os.stat(CURVE_FILE); key=(st.st_ino,st.st_mtime_ns)
+    except OSError:
+        key=None
+    if _compiled_curve is None or key!=_compiled_curve_key:
+        _compiled_curve=CompiledCurve(load_curve()); _compiled_curve_key=key
+    return _compiled_curve
+
 def compute_pwm_from_curve(temp):
-    curve=sorted(load_curve(),key=lambda p:p["temp"])
-    if not curve: return 0
-    if temp<=curve[0]["temp"]: return int(curve[0]["pwm"])
-    if temp>=curve[-1]["temp"]: return int(curve[-1]["pwm"])
-    for i in range(len(curve)-1):
-        t1,p1=curve[i]["temp"],curve[i]["pwm"]
-        t2,p2=curve[i+1]["temp"],curve[i+1]["pwm"]
-        if t1<=temp<=t2:
-            if t2==t1: return int(p1)
-            r=(temp-t1)/(t2-t1)
-            return int(p1+r*(p2-p1))
-    return int(curve[-1]["pwm"])
+    return compiled_curve().pwm(temp)
 
 # -----------------------------
 # ---------- Sensors ----------
 # -----------------------------
+thermal_sensor = ThermalSensor()
+cpu_stats = CpuStats()
+
 def get_cpu_temp():
-    try:
-        out=subprocess.check_output(["vcgencmd","measure_temp"]).decode()
-        return float(out.replace("temp=","").replace("'C\n",""))
-    except:
-        return 0.0
+    return thermal_sensor.read()
 
 # -----------------------------
 # ---------- Graph helpers ----------
@@ -1481,7 +1488,7 @@ def update():
     except: pass
 
     # --- Lecturas del sistema ---
-    cpu = psutil.cpu_percent()
+    cpu = cpu_stats.percent()
     ram = psutil.virtual_memory().percent
     temp = get_cpu_temp()
     disk_io = psutil.disk_io_counters()
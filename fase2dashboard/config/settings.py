@@ -3,8 +3,16 @@
 # -----------------------------
 # ---------- Archivos ----------
 # -----------------------------
-STATE_FILE = "/home/jalivur/Documents/proyectopantallas/fan_state.json"
-CURVE_FILE = "/home/jalivur/Documents/proyectopantallas/fan_curve.json"
+# Configuración duradera (SD) y estado volátil (tmpfs). Ver core/state_store.py
+DATA_DIR = "/home/jalivur/Documents/proyectopantallas"
+RUNTIME_DIRS = ("/run/proyectopantallas", "/dev/shm/proyectopantallas")
+CURVE_FILE = DATA_DIR + "/fan_curve.json"
+# Sensores que pueden alimentar la curva de cada ventilador: fan0 (disipador)
+# va siempre con la CPU; fan1 (caja) con el chasis de la placa o la NVMe.
+FAN_SENSORS = ("cpu", "chassis", "nvme")
+FAN1_DEFAULT_SENSOR = "chassis"
+# PWM de los modos fijos; los aplica fase1 (el dashboard solo manda el modo)
+FAN_MODE_PWM = {"silent": 77, "normal": 128, "performance": 255}
 
 # -----------------------------
 # ---------- Display ----------
@@ -17,6 +25,54 @@ DSI_HEIGHT = 480
 # -----------------------------
 UPDATE_MS = 2000
 HISTORY = 60
+SAMPLER_INTERVAL = 1.0   # segundos entre muestras del hilo de sensores
+SLOW_SAMPLER_INTERVAL = 5.0   # métricas que cambian despacio (uso de disco, temp. disco)
+USB_SAMPLER_INTERVAL = 5.0    # refresco automático de la ventana USB
+PROC_SAMPLER_INTERVAL = 2.0   # escaneo de /proc para la ventana de procesos
+PROC_TOP_N = 8                # procesos mostrados por CPU y por RAM
+METRICS_BUS_MAX_AGE = 3.0   # segundos; más antiguo = fase1 parado, se muestrea localmente
+CONTROL_SOCKET = "/tmp/proyectopantallas_control.sock"   # órdenes y estado con fase1
+CONTROL_SOCKET_MODE = 0o660   # solo el usuario de fase1 y su grupo
+CONTROL_SOCKET_GROUP = None   # grupo del usuario del dashboard si corre con otro usuario
+# Modo "pid" de ventiladores (core/fan_controller.py)
+PID_SETPOINT = 55.0   # °C de CPU a mantener
+PID_KP = 12.0         # PWM por °C de error
+PID_KI = 0.6          # PWM por °C·s acumulado
+PID_KD = 4.0          # PWM por °C/s (sobre la medida)
+PID_MIN_PWM = 40
+PID_MAX_PWM = 255
+# Planificador de duty antes de escribir por I2C (core/fan_controller.DutyPlanner)
+FAN_DEADBAND = 6      # PWM; cambios menores no se escriben
+FAN_MAX_RAMP = 40     # PWM por segundo como máximo
+FAN_MIN_HOLD = 3.0    # segundos mínimos antes de volver a bajar
+# Feed-forward por carga: EWMA rápida - EWMA lenta del % de CPU (tendencia)
+FF_ALPHA_FAST = 0.5
+FF_ALPHA_SLOW = 0.05
+FF_GAIN = 3.0         # PWM extra por punto de % de tendencia
+FF_MAX = 100          # PWM extra como máximo
+# Traza t,cpu,temp,pwm para el simulador (python -m core.fan_sim traza.csv); None = no grabar
+FAN_TRACE_FILE = None
+
+# Verificación de ventiladores (core/fan_verify.py): duty leído frente al
+# pedido y tacómetro del ventilador de la Pi
+FAN_VERIFY_PERIOD = 2       # segundos entre comprobaciones
+FAN_VERIFY_TOLERANCE = 3    # PWM de diferencia admitida entre pedido y leído
+FAN_VERIFY_CONFIRM = 3      # comprobaciones seguidas para dar un fallo por bueno
+FAN_STALL_PWM = 80          # por encima de este PWM el ventilador tiene que girar
+FAN_STALL_RPM = 200         # menos de esto se considera parado
+FAN_NO_TEMP_PWM = 255       # auto/pid sin lectura de temperatura de CPU
+# Ajuste automático de la curva (core/curve_tuner.py) a partir de FAN_TRACE_FILE
+TUNER_PERCENTILE = 95       # la curva debe cumplir TEMP_WARN hasta este percentil de carga
+TUNER_MIN_PWM = 40          # ningún punto de la propuesta por debajo de esto
+# Efectos LED calculados en fase1 (core/led_effects.py)
+LED_COUNT = 4               # LEDs de la placa de expansión
+LED_FPS = 20                # frames por segundo si el led_state no dice otra cosa
+LED_MAX_FPS = 30
+LED_MAX_WRITES_PER_S = 100  # tope de escrituras I2C de LEDs (el bus es compartido con el OLED)
+
+HW_STATE_PERIOD = 5      # segundos entre escrituras de hardware_state.json en fase1
+HW_STALE_FACTOR = 3      # más antiguo que factor x periodo = fase1 parado
+STATE_WRITE_COALESCE_S = 0.3   # ráfagas de escrituras de estado/curva se agrupan en una
 
 CPU_WARN  = 60
 CPU_CRIT  = 85
@@ -41,6 +97,10 @@ DISK_MAX_SCALE = 10000 # MB/s límite superior
 DISK_IDLE_THRESHOLD = 0.5  # MB/s mínimo para considerar inactivo
 DISK_IDLE_RESET_TIME = 15  # segundos
 
+DISK_DEVICE = "/dev/nvme0n1"
+DISK_TEMP_TTL = 1.0         # segundos que se comparte una misma lectura
+DISK_SMART_INTERVAL = 60    # segundos mínimos entre llamadas a smart-log (sin hwmon)
+
 LAUNCHERS = [
     {
         "label": "Montar NAS",
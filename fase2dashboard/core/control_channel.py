@@ -0,0 +1,309 @@
+import grp
+import json
+import os
+import selectors
+import socket
+import threading
+from config.settings import CONTROL_SOCKET, CONTROL_SOCKET_MODE, CONTROL_SOCKET_GROUP
+
+
+# -----------------------------
+# ---------- Protocolo ----------
+# -----------------------------
+# Socket Unix de tipo stream con un mensaje JSON compacto por línea:
+#
+#   cliente -> fase1 : {"t":"sub"}                         suscribirse a cambios
+#                      {"t":"cmd","k":"fan","d":{...}}     orden (fan / led)
+#   fase1 -> cliente : {"t":"state","k":"fan","s":7,"d":{...}}
+#                      estado actual de un tema con su número de secuencia
+#
+# Al suscribirse el cliente recibe de inmediato el estado de todos los temas;
+# después, cada cambio se empuja en cuanto fase1 lo aplica. Cualquier
+# mensaje que no sea un objeto JSON se ignora.
+MAX_LINE = 64 * 1024
+MAX_OUTGOING = 256 * 1024   # estado sin enviar a un cliente lento antes de soltarlo
+
+
+def encode(msg):
+    return json.dumps(msg, separators=(",", ":")).encode() + b"\n"
+
+
+class ControlServer:
+    """
+    Lado fase1: acepta clientes, recibe órdenes y empuja el estado.
+
+    No tiene hilo propio. El bucle de fase1 llama a poll(timeout) en lugar de
+    dormir, así que una orden se atiende en cuanto llega al socket.
+    """
+
+    def __init__(self, on_command, path=CONTROL_SOCKET, mode=CONTROL_SOCKET_MODE, group=CONTROL_SOCKET_GROUP):
+        self.path = path
+        self._on_command = on_command
+        self._sel = selectors.DefaultSelector()
+        self._buffers = {}      # socket cliente -> bytearray pendiente
+        self._outgoing = {}     # socket cliente -> bytearray aún sin enviar
+        self._subscribers = set()
+        self._state = {}        # tema -> último estado publicado
+        self._seq = {}          # tema -> secuencia del último estado
+
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(path)
+        # Solo el dueño (y el grupo, si el dashboard corre con otro usuario)
+        # puede conectarse y mandar órdenes
+        if group:
+            try:
+                os.chown(path, -1, grp.getgrnam(group).gr_gid)
+            except (KeyError, OSError) as e:
+                print(f"[control] No se pudo asignar el grupo {group} al socket: {e}")
+        os.chmod(path, mode)
+        self._sock.listen(4)
+        self._sock.setblocking(False)
+        self._sel.register(self._sock, selectors.EVENT_READ)
+
+    def poll(self, timeout):
+        """
+        Espera hasta `timeout` segundos atendiendo conexiones y mensajes.
+        Un error con un cliente solo cierra esa conexión: el bucle de fase1
+        no debe caerse por lo que llegue al socket.
+        """
+        for key, events in self._sel.select(timeout):
+            if key.fileobj is self._sock:
+                self._accept()
+                continue
+            try:
+                if events & selectors.EVENT_WRITE:
+                    self._flush(key.fileobj)
+                if events & selectors.EVENT_READ:
+                    self._read(key.fileobj)
+            except Exception as e:
+                print(f"[control] Error atendiendo cliente: {e}")
+                self._drop(key.fileobj)
+
+    def _accept(self):
+        try:
+            conn, _ = self._sock.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        self._buffers[conn] = bytearray()
+        self._outgoing[conn] = bytearray()
+        self._sel.register(conn, selectors.EVENT_READ)
+
+    def _drop(self, conn):
+        if self._buffers.pop(conn, None) is None:
+            return   # ya cerrada (p. ej. falló un envío mientras se leía)
+        self._outgoing.pop(conn, None)
+        self._subscribers.discard(conn)
+        try:
+            self._sel.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+        conn.close()
+
+    def _read(self, conn):
+        try:
+            data = conn.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(conn)
+            return
+
+        buf = self._buffers.get(conn)
+        if buf is None:
+            return
+        buf.extend(data)
+        if len(buf) > MAX_LINE and b"\n" not in buf:
+            self._drop(conn)
+            return
+        while b"\n" in buf:
+            line, _, rest = bytes(buf).partition(b"\n")
+            buf[:] = rest
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(msg, dict):
+                continue
+            self._handle(conn, msg)
+            if conn not in self._buffers:
+                return   # la conexión se cerró al responder
+
+    def _handle(self, conn, msg):
+        kind = msg.get("t")
+        if kind == "sub":
+            self._subscribers.add(conn)
+            for topic, data in self._state.items():
+                self._send(conn, {"t": "state", "k": topic, "s": self._seq[topic], "d": data})
+        elif kind == "cmd" and isinstance(msg.get("d"), dict):
+            try:
+                self._on_command(msg.get("k"), msg["d"])
+            except Exception as e:
+                print(f"[control] Error aplicando orden {msg.get('k')}: {e}")
+
+    def _send(self, conn, msg):
+        """
+        Encola `msg` y envía lo que quepa. Si el cliente no lee (buffer del
+        socket lleno) el resto espera a que poll() vea el socket escribible;
+        solo se suelta al cliente si acumula más de MAX_OUTGOING o hay un
+        error real.
+        """
+        out = self._outgoing.get(conn)
+        if out is None:
+            return
+        out.extend(encode(msg))
+        if len(out) > MAX_OUTGOING:
+            print("[control] Cliente demasiado lento, se cierra la conexión")
+            self._drop(conn)
+            return
+        self._flush(conn)
+
+    def _flush(self, conn):
+        out = self._outgoing.get(conn)
+        if out is None:
+            return
+        try:
+            while out:
+                sent = conn.send(out)
+                del out[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._drop(conn)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if out else 0)
+        if self._sel.get_key(conn).events != events:
+            self._sel.modify(conn, events)
+
+    def publish(self, topic, data):
+        """Guarda el estado del tema y lo empuja a todos los suscriptores si ha cambiado."""
+        if self._state.get(topic) == data:
+            return
+        self._state[topic] = data
+        self._seq[topic] = self._seq.get(topic, 0) + 1
+        msg = {"t": "state", "k": topic, "s": self._seq[topic], "d": data}
+        for conn in list(self._subscribers):
+            self._send(conn, msg)
+
+    def close(self):
+        for conn in list(self._buffers):
+            self._drop(conn)
+        self._sel.unregister(self._sock)
+        self._sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class ControlClient:
+    """
+    Lado dashboard: hilo que mantiene la conexión con fase1, se suscribe y
+    guarda el último estado empujado de cada tema.
+    """
+
+    def __init__(self, path=CONTROL_SOCKET, reconnect_interval=2.0, on_state=None):
+        self.path = path
+        self.reconnect_interval = reconnect_interval
+        self._on_state = on_state
+        self._lock = threading.Lock()
+        self._sock = None
+        self._state = {}
+        self._seq = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._disconnect()
+
+    def get_state(self, topic):
+        """Último estado recibido de `topic` (None si no hay conexión o aún no ha llegado)."""
+        if not self.connected:
+            return None
+        return self._state.get(topic)
+
+    def get_seq(self, topic):
+        """Secuencia del último estado de `topic`; cambia con cada empuje de fase1."""
+        if not self.connected:
+            return None
+        return self._seq.get(topic)
+
+    def send(self, topic, data):
+        """Envía una orden. Devuelve False si fase1 no está escuchando."""
+        with self._lock:
+            if self._sock is None:
+                return False
+            try:
+                self._sock.sendall(encode({"t": "cmd", "k": topic, "d": data}))
+                return True
+            except OSError:
+                pass
+        self._disconnect()
+        return False
+
+    def _disconnect(self):
+        with self._lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.path)
+                sock.sendall(encode({"t": "sub"}))
+            except OSError:
+                sock.close()
+                self._stop_event.wait(self.reconnect_interval)
+                continue
+
+            with self._lock:
+                self._sock = sock
+            self._listen(sock)
+            self._disconnect()
+            self._state = {}
+            self._seq = {}
+
+    def _listen(self, sock):
+        buf = b""
+        while not self._stop_event.is_set():
+            try:
+                data = sock.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            buf += data
+            while b"\n" in buf:
+                line, _, buf = buf.partition(b"\n")
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(msg, dict) and msg.get("t") == "state":
+                    self._state[msg.get("k")] = msg.get("d")
+                    self._seq[msg.get("k")] = msg.get("s")
+                    if self._on_state:
+                        self._on_state(msg.get("k"), msg.get("d"))
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+
+# Porcentajes de un core (o del total) en el último intervalo.
+# busy = todo menos idle e iowait (misma definición que psutil.cpu_percent).
+CpuTimes = namedtuple("CpuTimes", ["busy", "user", "system", "iowait", "irq", "steal"])
+
+# Columnas de /proc/stat que usamos (guest ya va incluido en user)
+_USER, _NICE, _SYSTEM, _IDLE, _IOWAIT, _IRQ, _SOFTIRQ, _STEAL = range(8)
+_NFIELDS = 8
+
+_ZERO = CpuTimes(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+class CpuStats:
+    """
+    Contabilidad de CPU leída directamente de /proc/stat.
+
+    Una sola lectura del fichero alimenta a todos los consumidores: si se
+    vuelve a pedir antes de `min_interval` segundos se devuelve el mismo
+    resultado, de modo que todos ven los mismos números en lugar de un
+    delta "desde el último que preguntó" como ocurre con psutil.cpu_percent().
+
+    Los contadores se guardan en dos juegos de listas preasignadas que se
+    intercambian en cada lectura; no se crean estructuras nuevas por tick
+    salvo las tuplas inmutables del resultado.
+    """
+
+    def __init__(self, path="/proc/stat", min_interval=0.25):
+        self.path = path
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._fd = None
+        self._last_update = None
+
+        self.ncores = self._count_cores()
+        rows = self.ncores + 1   # fila 0 = total "cpu", filas 1.. = cpuN
+        self._prev = [[0] * _NFIELDS for _ in range(rows)]
+        self._curr = [[0] * _NFIELDS for _ in range(rows)]
+
+        self.total = _ZERO
+        self.cores = (_ZERO,) * self.ncores
+
+        # Primera lectura como referencia para los deltas
+        self._read_into(self._prev)
+
+    # -----------------------------
+    # ---------- Lectura ----------
+    # -----------------------------
+    def _count_cores(self):
+        n = 0
+        for line in self._read_lines():
+            if line.startswith("cpu") and line[3:4].isdigit():
+                n += 1
+            elif n:
+                break
+        return n
+
+    def _read_lines(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY)
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(self._fd, 65536, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b"".join(chunks).decode().splitlines()
+
+    def _read_into(self, table):
+        for line in self._read_lines():
+            if not line.startswith("cpu"):
+                break
+            parts = line.split()
+            name = parts[0]
+            row = 0 if name == "cpu" else int(name[3:]) + 1
+            if row >= len(table):
+                continue   # core que aparece en caliente: se ignora
+            values = table[row]
+            for i in range(_NFIELDS):
+                values[i] = int(parts[i + 1]) if i + 1 < len(parts) else 0
+
+    @staticmethod
+    def _percentages(prev, curr):
+        d = [curr[i] - prev[i] for i in range(_NFIELDS)]
+        total = sum(d)
+        if total <= 0:
+            return _ZERO
+        scale = 100.0 / total
+        idle = d[_IDLE] + d[_IOWAIT]
+        return CpuTimes(
+            busy=(total - idle) * scale,
+            user=(d[_USER] + d[_NICE]) * scale,
+            system=d[_SYSTEM] * scale,
+            iowait=d[_IOWAIT] * scale,
+            irq=(d[_IRQ] + d[_SOFTIRQ]) * scale,
+            steal=d[_STEAL] * scale,
+        )
+
+    # -----------------------------
+    # ---------- API ----------
+    # -----------------------------
+    def update(self):
+        """Lee /proc/stat si ha pasado `min_interval` y recalcula los deltas."""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_update is not None and now - self._last_update < self.min_interval:
+                return self.total
+            try:
+                self._read_into(self._curr)
+            except (OSError, ValueError):
+                return self.total
+            self._last_update = now
+
+            prev, curr = self._prev, self._curr
+            self.total = self._percentages(prev[0], curr[0])
+            self.cores = tuple(
+                self._percentages(prev[i], curr[i]) for i in range(1, self.ncores + 1)
+            )
+            self._prev, self._curr = curr, prev
+            return self.total
+
+    def percent(self):
+        """Uso total en %, equivalente a psutil.cpu_percent()."""
+        return self.update().busy
+
+    def per_core(self):
+        self.update()
+        return self.cores
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
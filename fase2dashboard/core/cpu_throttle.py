@@ -0,0 +1,172 @@
+import glob
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+
+# Bits de get_throttled del firmware de la Raspberry Pi
+UNDER_VOLTAGE      = 1 << 0
+FREQ_CAPPED        = 1 << 1
+THROTTLED          = 1 << 2
+SOFT_TEMP_LIMIT    = 1 << 3
+UNDER_VOLTAGE_OCC  = 1 << 16
+FREQ_CAPPED_OCC    = 1 << 17
+THROTTLED_OCC      = 1 << 18
+SOFT_TEMP_OCC      = 1 << 19
+
+ThrottleState = namedtuple("ThrottleState", [
+    "flags",
+    "under_voltage",
+    "freq_capped",
+    "throttled",
+    "soft_temp_limit",
+    "occurred",        # alguno de los anteriores ha pasado desde el arranque
+])
+
+
+def decode_throttled(flags):
+    return ThrottleState(
+        flags=flags,
+        under_voltage=bool(flags & UNDER_VOLTAGE),
+        freq_capped=bool(flags & FREQ_CAPPED),
+        throttled=bool(flags & THROTTLED),
+        soft_temp_limit=bool(flags & SOFT_TEMP_LIMIT),
+        occurred=bool(flags & 0xF0000),
+    )
+
+
+def throttle_level(state):
+    """Nivel para graficar: 0 nada, 1 límite suave/frecuencia capada, 2 throttling, 3 subtensión."""
+    if state is None:
+        return 0
+    if state.under_voltage:
+        return 3
+    if state.throttled:
+        return 2
+    if state.freq_capped or state.soft_temp_limit:
+        return 1
+    return 0
+
+
+def throttle_text(state):
+    if state is None:
+        return "N/A"
+    active = []
+    if state.under_voltage:
+        active.append("SUBTENSIÓN")
+    if state.throttled:
+        active.append("THROTTLING")
+    if state.freq_capped:
+        active.append("FREQ CAPADA")
+    if state.soft_temp_limit:
+        active.append("LÍMITE TEMP")
+    if active:
+        return " | ".join(active)
+    return "OK (ha ocurrido)" if state.occurred else "OK"
+
+
+class CpuThrottle:
+    """
+    Frecuencia por core y estado de throttling del SoC.
+
+    Los ficheros scaling_cur_freq de cada core y el get_throttled del
+    firmware se abren una vez y se releen con pread. Si el kernel no expone
+    get_throttled se usa `vcgencmd get_throttled`, cacheado `vcgencmd_ttl`
+    segundos para no lanzar un proceso en cada tick.
+    """
+
+    CPUFREQ_GLOB = "/sys/devices/system/cpu/cpu[0-9]*/cpufreq"
+    THROTTLED_PATHS = (
+        "/sys/devices/platform/soc/soc:firmware/get_throttled",
+        "/sys/devices/platform/firmware/get_throttled",
+    )
+
+    def __init__(self, vcgencmd_ttl=30.0):
+        self.vcgencmd_ttl = vcgencmd_ttl
+        self._lock = threading.Lock()
+        self._freq_fds = []
+        self.max_mhz = 0.0
+        self._throttled_fd = None
+        self._vcgencmd_value = None
+        self._vcgencmd_ts = None
+
+        def core_number(path):
+            return int(re.search(r"cpu(\d+)", path).group(1))
+
+        for cpufreq in sorted(glob.glob(self.CPUFREQ_GLOB), key=core_number):
+            try:
+                fd = os.open(os.path.join(cpufreq, "scaling_cur_freq"), os.O_RDONLY)
+            except OSError:
+                continue
+            self._freq_fds.append(fd)
+            try:
+                with open(os.path.join(cpufreq, "cpuinfo_max_freq")) as f:
+                    self.max_mhz = max(self.max_mhz, int(f.read()) / 1000.0)
+            except (OSError, ValueError):
+                pass
+
+        for path in self.THROTTLED_PATHS:
+            try:
+                self._throttled_fd = os.open(path, os.O_RDONLY)
+                break
+            except OSError:
+                continue
+
+    # -----------------------------
+    # ---------- Frecuencia ----------
+    # -----------------------------
+    def read_freqs(self):
+        """Frecuencia actual de cada core en MHz (tupla vacía si no hay cpufreq)."""
+        freqs = []
+        for fd in self._freq_fds:
+            try:
+                freqs.append(int(os.pread(fd, 32, 0)) / 1000.0)
+            except (OSError, ValueError):
+                freqs.append(0.0)
+        return tuple(freqs)
+
+    # -----------------------------
+    # ---------- Throttling ----------
+    # -----------------------------
+    def _read_vcgencmd(self):
+        now = time.monotonic()
+        if self._vcgencmd_ts is not None and now - self._vcgencmd_ts < self.vcgencmd_ttl:
+            return self._vcgencmd_value
+        self._vcgencmd_ts = now
+        try:
+            out = subprocess.check_output(["vcgencmd", "get_throttled"], stderr=subprocess.DEVNULL).decode()
+            self._vcgencmd_value = int(out.strip().split("=")[1], 16)
+        except Exception:
+            self._vcgencmd_value = None
+        return self._vcgencmd_value
+
+    def read_throttled(self):
+        """ThrottleState actual, o None si no hay ninguna fuente disponible."""
+        with self._lock:
+            flags = None
+            if self._throttled_fd is not None:
+                try:
+                    flags = int(os.pread(self._throttled_fd, 32, 0).strip() or b"0", 16)
+                except (OSError, ValueError):
+                    os.close(self._throttled_fd)
+                    self._throttled_fd = None
+            if flags is None:
+                flags = self._read_vcgencmd()
+            return decode_throttled(flags) if flags is not None else None
+
+    def close(self):
+        for fd in self._freq_fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._freq_fds = []
+        if self._throttled_fd is not None:
+            try:
+                os.close(self._throttled_fd)
+            except OSError:
+                pass
+            self._throttled_fd = None
@@ -1,58 +1,239 @@
+import bisect
 import json
-from config.settings import CURVE_FILE
+import time
+from collections import namedtuple
+from config.settings import CURVE_FILE, FAN_SENSORS, FAN1_DEFAULT_SENSOR
+from core.file_watch import FileWatcher
+
+DEFAULT_CURVE = [
+    {"temp": 40, "pwm": 100},
+    {"temp": 50, "pwm": 130},
+    {"temp": 60, "pwm": 160},
+    {"temp": 70, "pwm": 180},
+    {"temp": 80, "pwm": 200}
+]
+
+# Curva de partida para el ventilador de la caja: lenta, el chasis y la
+# NVMe se calientan mucho menos que la CPU.
+DEFAULT_CASE_CURVE = [
+    {"temp": 30, "pwm": 40},
+    {"temp": 40, "pwm": 60},
+    {"temp": 50, "pwm": 90},
+    {"temp": 60, "pwm": 130},
+    {"temp": 70, "pwm": 180}
+]
+
+FANS = ("fan0", "fan1")
+
+# Curva de un ventilador y el sensor que la alimenta ("cpu", "chassis", "nvme")
+FanCurve = namedtuple("FanCurve", ["sensor", "curve"])
+
+class CompiledCurve:
+    """
+    Curva ya preparada para evaluar: puntos ordenados en listas paralelas y
+    una tabla densa de PWM entre LUT_MIN y LUT_MAX °C cada LUT_STEP.
+
+    pwm(temp) es un índice en la tabla; fuera de rango se interpola con
+    bisect sobre las listas. Se construye una vez por cambio de la curva.
+    """
+
+    LUT_MIN = 0.0
+    LUT_MAX = 110.0
+    LUT_STEP = 0.1
+
+    __slots__ = ("points", "temps", "pwms", "_lut")
+
+    def __init__(self, points):
+        self.points = sorted(points, key=lambda x: x["temp"])
+        self.temps = [p["temp"] for p in self.points]
+        self.pwms = [p["pwm"] for p in self.points]
+        size = int(round((self.LUT_MAX - self.LUT_MIN) / self.LUT_STEP)) + 1
+        self._lut = bytes(
+            max(0, min(255, self.interpolate(self.LUT_MIN + i * self.LUT_STEP)))
+            for i in range(size)
+        )
+
+    def interpolate(self, temp):
+        """Interpolación lineal exacta (mismo resultado que el recorrido punto a punto)."""
+        temps, pwms = self.temps, self.pwms
+        if not temps:
+            return 0
+        if temp <= temps[0]:
+            return int(pwms[0])
+        if temp >= temps[-1]:
+            return int(pwms[-1])
+        i = bisect.bisect_left(temps, temp)
+        t1, t2 = temps[i - 1], temps[i]
+        if t2 == t1:
+            return int(pwms[i])
+        ratio = (temp - t1) / (t2 - t1)
+        return int(pwms[i - 1] + ratio * (pwms[i] - pwms[i - 1]))
+
+    def pwm(self, temp):
+        i = int(round((temp - self.LUT_MIN) / self.LUT_STEP))
+        if 0 <= i < len(self._lut):
+            return self._lut[i]
+        return self.interpolate(temp)
+
 
 class CurveLogic:
+    """
+    Curvas temperatura -> PWM de fan_curve.json.
+
+    "points" es la curva de fan0 (disipador, siempre con la CPU). Una
+    entrada opcional "fan1": {"sensor": ..., "points": [...]} da al
+    ventilador de la caja su propia curva y sensor; sin ella fan1 sigue a
+    fan0 como antes.
+
+    El fichero se vigila con FileWatcher (inotify, o inode/mtime con stat):
+    solo cuando cambia se vuelve a leer, sanear y compilar en CompiledCurve;
+    compute_pwm es una consulta a su tabla.
+    """
+
+    def __init__(self, watcher=None, path=CURVE_FILE):
+        self._watcher = watcher or FileWatcher()
+        self._curves = self._watcher.watch(
+            path,
+            loader=self._compile,
+            default=self._compile_data({}),
+        )
+
+    @property
+    def reloads(self):
+        return self._curves.reloads
+
+    def curves(self):
+        """{"fan0": FanCurve, ["fan1": FanCurve]} de la versión actual del fichero."""
+        return self._curves.get()
 
-    def load_curve(self):
+    def compiled(self, fan="fan0"):
+        return self.fan_curve(fan).curve
+
+    def fan_curve(self, fan="fan0"):
+        """FanCurve de `fan`; fan1 sin curva propia devuelve la de fan0."""
+        curves = self.curves()
+        return curves.get(fan) or curves["fan0"]
+
+    def has_own_curve(self, fan):
+        return fan in self.curves()
+
+    def sensor(self, fan="fan0"):
+        return self.fan_curve(fan).sensor
+
+    def load_curve(self, fan="fan0"):
+        return self.fan_curve(fan).curve.points
+
+    @classmethod
+    def _compile(cls, path):
         try:
-            with open(CURVE_FILE) as f:
+            with open(path) as f:
                 data = json.load(f)
-                pts = data.get("points", [])
-                if not isinstance(pts, list):
-                    pts = []
-                sanitized = []
-                for p in pts:
-                    try:
-                        t = int(p.get("temp", 0))
-                        pwm = int(p.get("pwm", 0))
-                        pwm = max(0, min(255, pwm))
-                        sanitized.append({"temp": t, "pwm": pwm})
-                    except:
-                        continue
-                if not sanitized:
-                    sanitized = [
-                        {"temp": 40, "pwm": 100},
-                        {"temp": 50, "pwm": 130},
-                        {"temp": 60, "pwm": 160},
-                        {"temp": 70, "pwm": 180},
-                        {"temp": 80, "pwm": 200}
-                    ]
-                return sorted(sanitized, key=lambda x: x["temp"])
         except:
-            return [
-                {"temp": 40, "pwm": 100},
-                {"temp": 50, "pwm": 130},
-                {"temp": 60, "pwm": 160},
-                {"temp": 70, "pwm": 180},
-                {"temp": 80, "pwm": 200}
-            ]
-
-    def compute_pwm(self, temp):
-        curve = self.load_curve()
-        if not curve:
-            return 0
+            data = {}
+        return cls._compile_data(data)
+
+    @classmethod
+    def _compile_data(cls, data):
+        if not isinstance(data, dict):
+            data = {}
+        curves = {"fan0": FanCurve("cpu", CompiledCurve(cls._sanitize(data.get("points"))))}
+        fan1 = data.get("fan1")
+        if isinstance(fan1, dict):
+            sensor = fan1.get("sensor")
+            if sensor not in FAN_SENSORS:
+                sensor = FAN1_DEFAULT_SENSOR
+            curves["fan1"] = FanCurve(sensor, CompiledCurve(cls._sanitize(fan1.get("points"), DEFAULT_CASE_CURVE)))
+        return curves
+
+    @staticmethod
+    def _sanitize(pts, default=DEFAULT_CURVE):
+        if not isinstance(pts, list):
+            pts = []
+        sanitized = []
+        for p in pts:
+            try:
+                t = int(p.get("temp", 0))
+                pwm = int(p.get("pwm", 0))
+                pwm = max(0, min(255, pwm))
+                sanitized.append({"temp": t, "pwm": pwm})
+            except:
+                continue
+        if not sanitized:
+            sanitized = default
+        return sorted(sanitized, key=lambda x: x["temp"])
+
+    @staticmethod
+    def _parse_curve(path):
+        """Puntos de fan0 tal cual están en el fichero (saneados)."""
+        try:
+            with open(path) as f:
+                return CurveLogic._sanitize(json.load(f).get("points", []))
+        except:
+            return DEFAULT_CURVE
+
+    def compute_pwm(self, temp, fan="fan0"):
+        return self.compiled(fan).pwm(temp)
+
+    def compute_fan_pwms(self, temps):
+        """
+        (pwm0, pwm1) con la temperatura del sensor de cada curva. `temps` es
+        {"cpu": .., "chassis": .., "nvme": ..}; un sensor sin lectura (None)
+        cae a la CPU. pwm1 es None si fan1 no tiene curva propia.
+        """
+        curves = self.curves()
+        cpu = temps.get("cpu")
+        pwm0 = curves["fan0"].curve.pwm(cpu)
+        fan1 = curves.get("fan1")
+        if fan1 is None:
+            return pwm0, None
+        t1 = temps.get(fan1.sensor)
+        return pwm0, fan1.curve.pwm(t1 if t1 is not None else cpu)
+
 
-        if temp <= curve[0]["temp"]:
-            return curve[0]["pwm"]
+def benchmark(calls=20000):
+    """
+    Coste por llamada: lectura y recorrido del JSON en cada llamada (como
+    antes) frente a la tabla compilada vigilada por FileWatcher.
+    """
+    import os
+    import random
+    import tempfile
 
-        if temp >= curve[-1]["temp"]:
+    temps = [random.uniform(30.0, 90.0) for _ in range(1000)]
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "fan_curve.json")
+        with open(path, "w") as f:
+            json.dump({"points": DEFAULT_CURVE}, f)
+
+        def per_call(temp):
+            curve = CurveLogic._parse_curve(path)
+            for i in range(len(curve) - 1):
+                t1, t2 = curve[i], curve[i + 1]
+                if t1["temp"] <= temp <= t2["temp"]:
+                    return int(t1["pwm"] + (temp - t1["temp"]) / (t2["temp"] - t1["temp"]) * (t2["pwm"] - t1["pwm"]))
             return curve[-1]["pwm"]
 
-        for i in range(len(curve) - 1):
-            t1 = curve[i]
-            t2 = curve[i + 1]
-            if t1["temp"] <= temp <= t2["temp"]:
-                ratio = (temp - t1["temp"]) / (t2["temp"] - t1["temp"])
-                return int(t1["pwm"] + ratio * (t2["pwm"] - t1["pwm"]))
+        results = {}
+        n = calls // 10
+        started = time.perf_counter()
+        for i in range(n):
+            per_call(temps[i % 1000])
+        results["json por llamada"] = (time.perf_counter() - started) / n
+
+        logic = CurveLogic(watcher=FileWatcher(), path=path)
+        started = time.perf_counter()
+        for i in range(calls):
+            logic.compute_pwm(temps[i % 1000])
+        results[f"compilada ({logic._watcher.backend})"] = (time.perf_counter() - started) / calls
+
+        compiled = logic.compiled()
+        started = time.perf_counter()
+        for i in range(calls):
+            compiled.pwm(temps[i % 1000])
+        results["solo tabla"] = (time.perf_counter() - started) / calls
+        return results
+
 
-        return curve[-1]["pwm"]
+if __name__ == "__main__":
+    for name, cost in benchmark().items():
+        print(f"{name:<22} {cost * 1e6:8.2f} us/llamada")
@@ -0,0 +1,248 @@
+import json
+from collections import namedtuple
+from config.settings import TEMP_WARN, TUNER_PERCENTILE, TUNER_MIN_PWM
+from core.curve_logic import CompiledCurve, DEFAULT_CURVE
+from core.fan_controller import ThermalModel, DutyPlanner
+from core.fan_sim import load_trace, estimate_power, simulate, CurvePolicy
+
+try:
+    import numpy as np
+except ImportError:   # mismo ajuste en Python puro, solo más lento
+    np = None
+
+
+# Temperaturas de los puntos de la curva propuesta (las de la curva por defecto)
+TUNE_TEMPS = tuple(p["temp"] for p in DEFAULT_CURVE)
+# Un cambio de velocidad se oye más que la misma velocidad sostenida: peso
+# del |ΔPWM| medio frente al PWM medio en la puntuación de ruido.
+SLEW_WEIGHT = 4.0
+
+TuneResult = namedtuple("TuneResult", [
+    "points",       # curva propuesta [{"temp", "pwm"}]
+    "feasible",     # False si ni la mejor curva cumple el límite
+    "limit_temp",   # peor temperatura simulada (con DutyPlanner) dentro del percentil
+    "predicted",    # SimResult de la propuesta (con DutyPlanner, como fase1)
+    "baseline",     # SimResult de la curva actual
+    "candidates",   # curvas evaluadas
+    "backend",      # "numpy" o "python"
+])
+
+
+# -----------------------------
+# ---------- Evaluación ----------
+# -----------------------------
+# Todas las curvas candidatas se simulan a la vez sobre la misma traza con
+# el modelo de ThermalModel y la dinámica de DutyPlanner (banda muerta,
+# rampa, hold), igual que fan_sim.simulate y que fase1: una curva que solo
+# cumple sin planificador no sirve. Devuelven, por candidata, (peor
+# temperatura en las muestras con límite, puntuación de ruido).
+def _evaluate_numpy(pwms, times, power, dts, mask, start_temp, model):
+    pwms = np.asarray(pwms, dtype=float)
+    n = len(pwms)
+    # Misma tabla que CompiledCurve, una fila por candidata
+    size = int(round((CompiledCurve.LUT_MAX - CompiledCurve.LUT_MIN) / CompiledCurve.LUT_STEP)) + 1
+    grid = CompiledCurve.LUT_MIN + np.arange(size) * CompiledCurve.LUT_STEP
+    lut = np.stack([np.interp(grid, TUNE_TEMPS, row) for row in pwms]).astype(int).astype(float)
+    rows = np.arange(n)
+    last = lut.shape[1] - 1
+    planner = DutyPlanner()
+
+    temp = np.full(n, float(start_temp))
+    duty = np.full(n, 100.0)
+    last_rise = np.full(n, -np.inf)
+    ramp = np.zeros(n)      # sentido de la rampa en marcha, como DutyPlanner._ramp
+    worst = np.full(n, -np.inf)
+    pwm_sum = np.zeros(n)
+    slew = np.zeros(n)
+    g_fan = model.g_fan / 255.0
+    prev = None
+    for now, p, dt, limited in zip(times, power, dts, mask):
+        temp += dt * (p - (temp - model.ambient) * (model.g_passive + g_fan * duty)) / model.heat_capacity
+        target = lut[rows, np.clip(np.rint((temp - CompiledCurve.LUT_MIN) / CompiledCurve.LUT_STEP), 0, last).astype(int)]
+        if prev is None:   # primer plan(): se escribe tal cual
+            new = target
+        else:
+            diff = target - duty
+            direction = np.sign(diff)
+            step = max(1, int(planner.max_ramp * (now - prev)))
+            held = (diff < 0) & (now - last_rise < planner.min_hold)
+            moves = (diff != 0) & ((np.abs(diff) >= planner.deadband) | (direction == ramp)) & ~held
+            extreme = (target == 0) | (target == 255)
+            new = np.where(extreme, target, np.where(moves, duty + np.clip(diff, -step, step), duty))
+            ramp = np.where(extreme | (diff == 0), 0,
+                            np.where(moves, np.where(new != target, direction, 0), ramp))
+            last_rise = np.where(new > duty, now, last_rise)
+        prev = now
+        slew += np.abs(new - duty)
+        duty = new
+        pwm_sum += duty * dt
+        if limited:
+            np.maximum(worst, temp, out=worst)
+    span = float(sum(dts))
+    noise = pwm_sum / span + SLEW_WEIGHT * slew / len(power)
+    return list(zip(worst.tolist(), noise.tolist()))
+
+
+def _evaluate_python(pwms, times, power, dts, mask, start_temp, model):
+    results = []
+    steps = list(zip(times, power, dts, mask))
+    span = float(sum(dts))
+    g_fan = model.g_fan / 255.0
+    for row in pwms:
+        curve = CompiledCurve([{"temp": t, "pwm": v} for t, v in zip(TUNE_TEMPS, row)])
+        clock = [0.0]
+        planner = DutyPlanner(clock=lambda: clock[0])
+        temp, duty = float(start_temp), 100
+        worst = float("-inf")
+        pwm_sum = slew = 0.0
+        for now, p, dt, limited in steps:
+            temp += dt * (p - (temp - model.ambient) * (model.g_passive + g_fan * duty)) / model.heat_capacity
+            clock[0] = now
+            planned = planner.plan(curve.pwm(temp))
+            if planned is not None:
+                slew += abs(planned - duty)
+                duty = planned
+            pwm_sum += duty * dt
+            if limited and temp > worst:
+                worst = temp
+        results.append((worst, pwm_sum / span + SLEW_WEIGHT * slew / len(steps)))
+    return results
+
+
+def _percentile(values, q):
+    if np is not None:
+        return float(np.percentile(values, q))
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+# -----------------------------
+# ---------- Búsqueda ----------
+# -----------------------------
+def _grid():
+    """Curvas crecientes base + pendiente por tramo (rejilla de partida)."""
+    curves = []
+    for base in range(TUNER_MIN_PWM, 256, 15):
+        for slope in range(0, 129, 8):
+            curves.append(tuple(min(255, base + slope * i) for i in range(len(TUNE_TEMPS))))
+    return curves
+
+
+def _lowered(curve, step=5, depth=12):
+    """Variantes con un punto más bajo, manteniendo la curva creciente y >= TUNER_MIN_PWM."""
+    variants = []
+    for i in range(len(curve)):
+        floor = max(TUNER_MIN_PWM, curve[i - 1] if i else 0)
+        for k in range(1, depth + 1):
+            value = curve[i] - step * k
+            if value < floor:
+                break
+            variants.append(curve[:i] + (value,) + curve[i + 1:])
+    return variants
+
+
+def tune(trace, percentile=TUNER_PERCENTILE, limit=TEMP_WARN, current=None,
+         model_factory=ThermalModel, use_numpy=True):
+    """
+    Curva de fan0 con el menor ruido que mantiene la temperatura simulada
+    por debajo de `limit` en todas las muestras cuya carga de CPU no supera
+    el percentil `percentile` de la traza.
+
+    La potencia de cada muestra sale de la traza (estimate_power). Primero se
+    evalúa una rejilla de curvas base + pendiente y después se bajan los
+    puntos de la mejor mientras siga cumpliendo. Las candidatas se simulan
+    con la dinámica de DutyPlanner y `feasible`/`limit_temp` salen de la
+    simulación de referencia (_evaluate_python) de la curva elegida, la
+    misma que fan_sim.simulate usa para `predicted`.
+    """
+    if not trace:
+        raise ValueError("traza vacía")
+    evaluate = _evaluate_numpy if (use_numpy and np is not None) else _evaluate_python
+    model = model_factory()
+    power = estimate_power(trace, model)
+    dts = [max((trace[i + 1].t - s.t) if i + 1 < len(trace) else 1.0, 1e-3) for i, s in enumerate(trace)]
+    load_limit = _percentile([s.cpu for s in trace], percentile)
+    mask = [s.cpu <= load_limit for s in trace]
+    times = [s.t for s in trace]
+    start_temp = trace[0].temp or 40.0
+
+    def score(curves):
+        return dict(zip(curves, evaluate(curves, times, power, dts, mask, start_temp, model)))
+
+    scored = score(_grid())
+    evaluated = len(scored)
+    feasible = {c: r for c, r in scored.items() if r[0] <= limit}
+    if feasible:
+        best = min(feasible, key=lambda c: feasible[c][1])
+        while True:
+            variants = [v for v in _lowered(best) if v not in scored]
+            if not variants:
+                break
+            batch = score(variants)
+            evaluated += len(batch)
+            scored.update(batch)
+            better = [v for v, r in batch.items() if r[0] <= limit and r[1] < scored[best][1]]
+            if not better:
+                break
+            best = min(better, key=lambda c: batch[c][1])
+    else:
+        best = min(scored, key=lambda c: scored[c][0])
+
+    points = [{"temp": t, "pwm": int(v)} for t, v in zip(TUNE_TEMPS, best)]
+    limit_temp = _evaluate_python([best], times, power, dts, mask, start_temp, model)[0][0]
+    return TuneResult(
+        points=points,
+        feasible=limit_temp <= limit,
+        limit_temp=limit_temp,
+        predicted=simulate(trace, CurvePolicy(points), model_factory),
+        baseline=simulate(trace, CurvePolicy(current or DEFAULT_CURVE), model_factory),
+        candidates=evaluated,
+        backend="numpy" if evaluate is _evaluate_numpy else "python",
+    )
+
+
+def tune_file(path, **kwargs):
+    return tune(load_trace(path), **kwargs)
+
+
+def proposal(result, percentile=TUNER_PERCENTILE):
+    """Documento fan_curve.json con la propuesta y lo que se espera de ella."""
+    return {
+        "points": result.points,
+        "tuning": {
+            "percentile": percentile,
+            "feasible": result.feasible,
+            "predicted": result.predicted._asdict(),
+            "baseline": result.baseline._asdict(),
+        },
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from core.fan_sim import synthetic_trace
+
+    parser = argparse.ArgumentParser(description="Propone una curva de fan0 a partir de una traza")
+    parser.add_argument("trace", nargs="?", help="CSV grabado por fase1 (FAN_TRACE_FILE); sin él, traza sintética")
+    parser.add_argument("--percentile", type=float, default=TUNER_PERCENTILE)
+    parser.add_argument("--write", help="guarda la propuesta como fan_curve.json en esta ruta")
+    parser.add_argument("--python", action="store_true", help="no usar NumPy")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace()
+    started = time.perf_counter()
+    result = tune(trace, percentile=args.percentile, use_numpy=not args.python)
+    elapsed = time.perf_counter() - started
+    print(f"{result.candidates} curvas sobre {len(trace)} muestras en {elapsed:.2f} s ({result.backend})")
+    print("propuesta:", ", ".join(f"{p['temp']}°C={p['pwm']}" for p in result.points),
+          "" if result.feasible else "(no cumple el límite)")
+    for name, r in (("actual", result.baseline), ("propuesta", result.predicted)):
+        print(f"{name:<10} pico {r.peak_temp:5.1f} media {r.mean_temp:5.1f} >WARN {r.time_warn:5.0f}s "
+              f"PWM {r.mean_pwm:6.1f} cambios {r.duty_changes:5d} I2C {r.i2c_writes:5d}")
+    if args.write:
+        with open(args.write, "w") as f:
+            json.dump(proposal(result, args.percentile), f, indent=2)
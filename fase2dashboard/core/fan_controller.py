@@ -0,0 +1,337 @@
+import time
+from config.settings import (
+    PID_SETPOINT, PID_KP, PID_KI, PID_KD, PID_MIN_PWM, PID_MAX_PWM,
+    FAN_DEADBAND, FAN_MAX_RAMP, FAN_MIN_HOLD,
+    FF_ALPHA_FAST, FF_ALPHA_SLOW, FF_GAIN, FF_MAX,
+)
+
+
+class PidFanController:
+    """
+    Modo "pid": mantiene la temperatura de CPU en un setpoint.
+
+    Acción inversa (más temperatura que el setpoint = más PWM). El paso es
+    fijo (`dt`, el periodo del bucle de fase1), no se mide el reloj: cada
+    update() es un tick. La derivada se calcula sobre la medida para no dar
+    saltos al cambiar el setpoint.
+
+    Anti-windup por integración condicional: si la salida está saturada y
+    el error empuja hacia la misma saturación, el integrador no acumula.
+    Además el término integral nunca supera por sí solo el rango de salida.
+    """
+
+    def __init__(self, setpoint=PID_SETPOINT, kp=PID_KP, ki=PID_KI, kd=PID_KD,
+                 dt=1.0, out_min=PID_MIN_PWM, out_max=PID_MAX_PWM):
+        self.setpoint = setpoint
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.dt = dt
+        self.out_min = out_min
+        self.out_max = out_max
+        self.reset()
+
+    def reset(self, output=None):
+        """
+        Reinicia el estado. Con `output` el integrador arranca en ese PWM,
+        así que al cambiar de modo solo se suma la parte proporcional.
+        """
+        self._integral = 0.0
+        self._last_temp = None
+        self.output = None
+        if output is not None:
+            self._integral = self._clamp(output)
+
+    def _clamp(self, value):
+        return max(self.out_min, min(self.out_max, value))
+
+    def update(self, temp):
+        """Un tick de control. Devuelve el PWM (0..255, entero)."""
+        error = temp - self.setpoint
+        derivative = 0.0
+        if self._last_temp is not None:
+            derivative = (temp - self._last_temp) / self.dt
+        self._last_temp = temp
+
+        p = self.kp * error
+        d = self.kd * derivative
+        candidate = self._integral + self.ki * error * self.dt
+        raw = p + candidate + d
+
+        saturated_high = raw > self.out_max and error > 0
+        saturated_low = raw < self.out_min and error < 0
+        if not (saturated_high or saturated_low):
+            self._integral = max(-self.out_max, min(self.out_max, candidate))
+
+        self.output = int(round(self._clamp(p + self._integral + d)))
+        return self.output
+
+
+class LoadFeedForward:
+    """
+    Término de adelanto por carga de CPU.
+
+    La temperatura va segundos por detrás de la carga, así que la curva o
+    el PID reaccionan tarde. Aquí se siguen dos medias exponenciales del %
+    de CPU de cada tick (rápida y lenta); su diferencia es la tendencia y,
+    cuando la carga sube, se suma `gain` PWM por punto de tendencia (como
+    mucho `max_boost`). Con carga estable la lenta alcanza a la rápida y el
+    extra vuelve a 0 solo, dejando el régimen a la curva o al PID.
+    """
+
+    def __init__(self, alpha_fast=FF_ALPHA_FAST, alpha_slow=FF_ALPHA_SLOW, gain=FF_GAIN,
+                 max_boost=FF_MAX):
+        self.alpha_fast = alpha_fast
+        self.alpha_slow = alpha_slow
+        self.gain = gain
+        self.max_boost = max_boost
+        self.fast = None
+        self.slow = None
+        self.boost = 0
+
+    def update(self, cpu_percent):
+        """Añade la muestra de este tick. Devuelve el PWM extra (entero)."""
+        if self.fast is None:
+            self.fast = self.slow = float(cpu_percent)
+        else:
+            self.fast += self.alpha_fast * (cpu_percent - self.fast)
+            self.slow += self.alpha_slow * (cpu_percent - self.slow)
+        trend = self.fast - self.slow
+        self.boost = int(max(0.0, min(self.max_boost, self.gain * trend)))
+        return self.boost
+
+    def apply(self, pwm):
+        return max(0, min(255, int(pwm) + self.boost))
+
+
+class DutyPlanner:
+    """
+    Filtro entre el controlador (curva, PID, modos fijos) y set_fan_duty.
+
+    - Banda muerta: cambios de objetivo menores que `deadband` no ponen en
+      marcha el duty; una rampa que ya va en ese sentido sí llega al objetivo.
+    - Rampa: el duty se mueve como mucho `max_ramp` PWM por segundo; plan()
+      hay que llamarlo en cada tick para que la rampa avance.
+    - Hold: tras una subida no se empieza a bajar hasta pasados `min_hold`
+      segundos (evita el sube-baja). Las subidas nunca esperan, para no
+      retrasar la refrigeración.
+
+    Los extremos (0 y 255) y las órdenes con immediate=True (cambio de modo
+    o PWM manual) se aplican de golpe, sin banda muerta, rampa ni hold: a
+    plena velocidad hay que llegar ya si la CPU está caliente. `writes`
+    cuenta escrituras I2C reales y `target_changes` las que se habrían hecho
+    sin planificador.
+    """
+
+    def __init__(self, deadband=FAN_DEADBAND, max_ramp=FAN_MAX_RAMP, min_hold=FAN_MIN_HOLD,
+                 clock=time.monotonic):
+        self.deadband = deadband
+        self.max_ramp = max_ramp
+        self.min_hold = min_hold
+        self._clock = clock
+        self.current = None
+        self._last_target = None
+        self._last_rise = None
+        self._ramp = 0
+        self._last_plan = None
+        self._ramp = 0          # sentido de la rampa en marcha (+1, -1; 0 = parada)
+        self.writes = 0
+        self.target_changes = 0
+
+    def plan(self, target, immediate=False):
+        """Duty a escribir ahora, o None si no hay que tocar el bus."""
+        target = max(0, min(255, int(target)))
+        now = self._clock()
+        if target != self._last_target:
+            self.target_changes += 1
+            self._last_target = target
+        elapsed = now - self._last_plan if self._last_plan is not None else 0.0
+        self._last_plan = now
+
+        current = self.current
+        if current is None or immediate or target in (0, 255):
+            self._ramp = 0
+            return self._write(target, now) if target != current else None
+        diff = target - current
+        if diff == 0:
+            self._ramp = 0
+            return None
+        direction = 1 if diff > 0 else -1
+        if abs(diff) < self.deadband and direction != self._ramp:
+            return None
+        if diff < 0 and self._last_rise is not None and now - self._last_rise < self.min_hold:
+            return None
+
+        step = max(1, int(self.max_ramp * elapsed))
+        duty = current + max(-step, min(step, diff))
+        self._ramp = direction if duty != target else 0
+        return self._write(duty, now)
+
+    def reset(self):
+        """Olvida el duty escrito (la placa lo ha cambiado por su cuenta): el siguiente plan() escribe."""
+        self.current = None
+        self._last_target = None
+        self._last_rise = None
+        self._ramp = 0
+
+    def _write(self, duty, now):
+        if self.current is not None and duty > self.current:
+            self._last_rise = now
+        self.current = duty
+        self.writes += 1
+        return duty
+
+
+# -----------------------------
+# ---------- Banco de pruebas offline ----------
+# -----------------------------
+class ThermalModel:
+    """
+    Modelo térmico de primer orden de la CPU con ventilador:
+
+        C * dT/dt = P - (T - T_amb) * (g_pasiva + g_fan * pwm / 255)
+
+    Suficiente para ver sobreoscilación, tiempo de asentamiento y windup;
+    los valores por defecto se parecen a una Pi 5 en la caja con dos
+    ventiladores (≈ 45 °C en reposo, ≈ 80 °C a plena carga sin ventilador).
+    """
+
+    def __init__(self, ambient=25.0, heat_capacity=12.0, g_passive=0.12, g_fan=0.35, temp=None):
+        self.ambient = ambient
+        self.heat_capacity = heat_capacity
+        self.g_passive = g_passive
+        self.g_fan = g_fan
+        self.temp = ambient if temp is None else temp
+
+    def step(self, power_w, pwm, dt):
+        g = self.g_passive + self.g_fan * max(0, min(255, pwm)) / 255.0
+        self.temp += dt * (power_w - (self.temp - self.ambient) * g) / self.heat_capacity
+        return self.temp
+
+
+def step_response(controller, model=None, power_steps=((0, 3.0), (60, 7.0), (240, 3.0)),
+                  duration=420, dt=1.0):
+    """
+    Simula `duration` segundos con escalones de potencia (segundo, vatios).
+    Devuelve (traza, métricas): traza = [(t, temp, pwm)], métricas con
+    sobreoscilación máxima, error medio en régimen y tiempo de asentamiento
+    (±1 °C) tras el primer escalón de subida.
+    """
+    model = model or ThermalModel(temp=40.0)
+    steps = sorted(power_steps)
+    trace = []
+    pwm = controller.out_min
+    power = steps[0][1]
+    for i in range(int(duration / dt)):
+        t = i * dt
+        for start, watts in steps:
+            if t >= start:
+                power = watts
+        temp = model.step(power, pwm, dt)
+        pwm = controller.update(temp)
+        trace.append((t, temp, pwm))
+
+    sp = controller.setpoint
+    rise = steps[1][0] if len(steps) > 1 else 0
+    fall = steps[2][0] if len(steps) > 2 else duration
+    window = [(t, temp) for t, temp, _ in trace if rise <= t < fall]
+    overshoot = max((temp - sp for _, temp in window), default=0.0)
+    settled_at = None
+    for t, temp in window:
+        if abs(temp - sp) > 1.0:
+            settled_at = None
+        elif settled_at is None:
+            settled_at = t
+    tail = [temp for t, temp in window if t >= fall - 30]
+    metrics = {
+        "overshoot": max(0.0, overshoot),
+        "settling_time": (settled_at - rise) if settled_at is not None else None,
+        "steady_error": (sum(tail) / len(tail) - sp) if tail else None,
+        "pwm_changes": sum(1 for a, b in zip(trace, trace[1:]) if a[2] != b[2]),
+    }
+    return trace, metrics
+
+
+def planner_benchmark(duration=3600, jitter=0.3, seed=1):
+    """
+    Escrituras I2C en `duration` ticks de 1 s con una curva lineal 40..75 °C
+    y ruido de ±`jitter` °C sobre una temperatura que deriva despacio:
+    sin planificador (cada cambio de PWM) frente a DutyPlanner.
+    """
+    import math
+    import random
+
+    rng = random.Random(seed)
+    clock = [0.0]
+    planner = DutyPlanner(clock=lambda: clock[0])
+    naive_writes = 0
+    last = None
+    for t in range(duration):
+        clock[0] = float(t)
+        temp = 55 + 8 * math.sin(t / 300.0) + rng.uniform(-jitter, jitter)
+        target = int(40 + (min(max(temp, 40), 75) - 40) * (255 - 40) / 35)
+        if target != last:
+            naive_writes += 1
+            last = target
+        planner.plan(target)
+    return naive_writes, planner.writes
+
+
+def bursty_load(duration=3600, seed=2):
+    """Carga de CPU (%) por segundo: reposo ~5 % con ráfagas de 20-90 s al 100 %."""
+    import random
+
+    rng = random.Random(seed)
+    load = []
+    while len(load) < duration:
+        load.extend([rng.uniform(2, 8)] * rng.randint(30, 180))
+        load.extend([rng.uniform(85, 100)] * rng.randint(20, 90))
+    return load[:duration]
+
+
+def feedforward_benchmark(duration=3600, seed=2):
+    """
+    Reproduce una carga a ráfagas sobre ThermalModel (potencia proporcional
+    a la carga) con la curva por defecto y con PID, con y sin LoadFeedForward.
+    Devuelve {etiqueta: (temp. pico, temp. media, PWM medio)}.
+    """
+    from core.curve_logic import CompiledCurve, DEFAULT_CURVE
+
+    curve = CompiledCurve(DEFAULT_CURVE)
+    load = bursty_load(duration, seed)
+    results = {}
+    for label, controller, use_ff in (
+        ("curva", None, False),
+        ("curva + feed-forward", None, True),
+        ("pid", PidFanController(), False),
+        ("pid + feed-forward", PidFanController(), True),
+    ):
+        model = ThermalModel(temp=40.0)
+        ff = LoadFeedForward()
+        pwm = 100
+        temps, pwms = [], []
+        for cpu in load:
+            temp = model.step(2.5 + 4.5 * cpu / 100.0, pwm, 1.0)
+            base = controller.update(temp) if controller else curve.pwm(temp)
+            ff.update(cpu)
+            pwm = ff.apply(base) if use_ff else base
+            temps.append(temp)
+            pwms.append(pwm)
+        results[label] = (max(temps), sum(temps) / len(temps), sum(pwms) / len(pwms))
+    return results
+
+
+if __name__ == "__main__":
+    for label, (peak, mean, mean_pwm) in feedforward_benchmark().items():
+        print(f"{label:<22} pico {peak:5.1f} °C | media {mean:5.1f} °C | PWM medio {mean_pwm:5.1f}")
+    naive, planned = planner_benchmark()
+    print(f"escrituras de duty en 1 h: sin planificador {naive}, con DutyPlanner {planned}")
+    for label, kw in (
+        ("por defecto", {}),
+        ("sin integral", {"ki": 0.0}),
+        ("agresivo", {"kp": PID_KP * 3, "ki": PID_KI * 3}),
+    ):
+        _, m = step_response(PidFanController(**kw))
+        settling = f"{m['settling_time']:.0f}s" if m["settling_time"] is not None else "no asienta"
+        print(f"{label:<13} sobreoscilación {m['overshoot']:5.2f} °C | asentamiento {settling:>10} | "
+              f"error régimen {m['steady_error']:+5.2f} °C | cambios PWM {m['pwm_changes']}")
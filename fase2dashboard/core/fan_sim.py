@@ -0,0 +1,274 @@
+import csv
+import os
+from collections import namedtuple
+from config.settings import TEMP_WARN, TEMP_CRIT, FAN_MODE_PWM
+from core.curve_logic import CompiledCurve, DEFAULT_CURVE
+from core.fan_controller import (
+    PidFanController, LoadFeedForward, DutyPlanner, ThermalModel, bursty_load,
+)
+
+
+# Una muestra por tick de una traza grabada. pwm es el duty que había
+# entonces (None si no se grabó); con él se deduce la potencia real.
+TraceSample = namedtuple("TraceSample", ["t", "cpu", "temp", "pwm"])
+
+SimResult = namedtuple("SimResult", [
+    "peak_temp",
+    "mean_temp",
+    "time_warn",       # segundos por encima de TEMP_WARN
+    "time_crit",       # segundos por encima de TEMP_CRIT
+    "mean_pwm",
+    "duty_changes",    # cambios del duty pedido por la política
+    "i2c_writes",      # escrituras que llegarían a set_fan_duty
+])
+
+# Potencia del SoC a partir del % de CPU cuando la traza no trae PWM
+IDLE_W = 2.5
+LOAD_W = 6.5
+
+
+# -----------------------------
+# ---------- Trazas ----------
+# -----------------------------
+def load_trace(path):
+    """CSV con cabecera t,cpu,temp[,pwm] (lo que graba TraceRecorder)."""
+    samples = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                pwm = row.get("pwm")
+                samples.append(TraceSample(
+                    float(row["t"]), float(row["cpu"]), float(row["temp"]),
+                    int(float(pwm)) if pwm not in (None, "") else None,
+                ))
+            except (KeyError, ValueError):
+                continue
+    return samples
+
+
+def synthetic_trace(duration=3600, seed=2):
+    """Traza sin temperatura real (solo carga a ráfagas) para pruebas sin grabaciones."""
+    return [TraceSample(float(t), cpu, 0.0, None) for t, cpu in enumerate(bursty_load(duration, seed))]
+
+
+class TraceRecorder:
+    """
+    Graba t,cpu,temp,pwm en CSV para reproducir después en el simulador.
+    Escribe en bloques de `flush_every` muestras para no tocar la SD cada tick.
+    """
+
+    def __init__(self, path, flush_every=60):
+        self.path = path
+        self.flush_every = flush_every
+        self._rows = []
+        self._t0 = None
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                f.write("t,cpu,temp,pwm\n")
+
+    def record(self, now, cpu, temp, pwm):
+        if self._t0 is None:
+            self._t0 = now
+        self._rows.append(f"{now - self._t0:.1f},{cpu:.1f},{temp:.2f},{pwm if pwm is not None else ''}\n")
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            with open(self.path, "a") as f:
+                f.writelines(self._rows)
+            self._rows = []
+
+
+def estimate_power(trace, model):
+    """
+    Potencia por tick. Con temperatura y PWM grabados se invierte el modelo
+    (C·dT/dt + (T - T_amb)·g(pwm)); si no, se estima a partir de la carga.
+    """
+    power = []
+    for prev, cur in zip(trace, trace[1:] + trace[-1:]):
+        if cur.pwm is not None and cur.temp and cur is not prev:
+            dt = max(cur.t - prev.t, 1e-3)
+            g = model.g_passive + model.g_fan * cur.pwm / 255.0
+            watts = model.heat_capacity * (cur.temp - prev.temp) / dt + (cur.temp - model.ambient) * g
+            power.append(max(0.0, watts))
+        else:
+            power.append(IDLE_W + LOAD_W * cur.cpu / 100.0)
+    return power
+
+
+# -----------------------------
+# ---------- Políticas ----------
+# -----------------------------
+# Una política es un objeto con reset() y __call__(temp, cpu) -> PWM, un
+# tick por llamada. Cualquier controlador nuevo se prueba envolviéndolo así.
+class CurvePolicy:
+    def __init__(self, points=DEFAULT_CURVE):
+        self.curve = points if isinstance(points, CompiledCurve) else CompiledCurve(points)
+
+    def reset(self):
+        pass
+
+    def __call__(self, temp, cpu):
+        return self.curve.pwm(temp)
+
+
+class FixedPolicy:
+    def __init__(self, pwm):
+        self.pwm = pwm
+
+    def reset(self):
+        pass
+
+    def __call__(self, temp, cpu):
+        return self.pwm
+
+
+class PidPolicy:
+    def __init__(self, **kwargs):
+        self.controller = PidFanController(**kwargs)
+
+    def reset(self):
+        self.controller.reset()
+
+    def __call__(self, temp, cpu):
+        return self.controller.update(temp)
+
+
+class FeedForwardPolicy:
+    """Otra política más el adelanto por carga de LoadFeedForward."""
+
+    def __init__(self, base, **kwargs):
+        self.base = base
+        self._kwargs = kwargs
+        self.ff = LoadFeedForward(**kwargs)
+
+    def reset(self):
+        self.base.reset()
+        self.ff = LoadFeedForward(**self._kwargs)
+
+    def __call__(self, temp, cpu):
+        self.ff.update(cpu)
+        return self.ff.apply(self.base(temp, cpu))
+
+
+def default_policies():
+    """Las políticas que existen hoy en fase1."""
+    return {
+        "curva por defecto": CurvePolicy(),
+        "silent": FixedPolicy(FAN_MODE_PWM["silent"]),
+        "normal": FixedPolicy(FAN_MODE_PWM["normal"]),
+        "performance": FixedPolicy(FAN_MODE_PWM["performance"]),
+        "pid": PidPolicy(),
+        "curva + ff": FeedForwardPolicy(CurvePolicy()),
+        "pid + ff": FeedForwardPolicy(PidPolicy()),
+    }
+
+
+# -----------------------------
+# ---------- Simulación ----------
+# -----------------------------
+def simulate(trace, policy, model_factory=ThermalModel, planner=True):
+    """Reproduce `trace` con `policy` sobre el modelo térmico. Devuelve SimResult."""
+    if not trace:
+        return SimResult(0.0, 0.0, 0.0, 0.0, 0.0, 0, 0)
+    power = estimate_power(trace, model_factory())
+    start_temp = trace[0].temp or 40.0
+    model = model_factory(temp=start_temp)
+    policy.reset()
+    clock = [0.0]
+    duty_planner = DutyPlanner(clock=lambda: clock[0]) if planner else None
+
+    duty = 100
+    last_target = None
+    peak = total = total_pwm = time_warn = time_crit = 0.0
+    changes = writes = 0
+    for i, sample in enumerate(trace):
+        dt = (trace[i + 1].t - sample.t) if i + 1 < len(trace) else 1.0
+        dt = max(dt, 1e-3)
+        clock[0] = sample.t
+        temp = model.step(power[i], duty, dt)
+        target = max(0, min(255, int(policy(temp, sample.cpu))))
+        if target != last_target:
+            changes += 1
+            last_target = target
+        if duty_planner:
+            planned = duty_planner.plan(target)
+            if planned is not None:
+                duty = planned
+        elif target != duty:
+            duty = target
+            writes += 1
+
+        peak = max(peak, temp)
+        total += temp * dt
+        total_pwm += duty * dt
+        if temp > TEMP_WARN:
+            time_warn += dt
+        if temp > TEMP_CRIT:
+            time_crit += dt
+
+    span = max(trace[-1].t - trace[0].t + 1.0, 1e-3)
+    return SimResult(
+        peak_temp=peak,
+        mean_temp=total / span,
+        time_warn=time_warn,
+        time_crit=time_crit,
+        mean_pwm=total_pwm / span,
+        duty_changes=changes,
+        i2c_writes=duty_planner.writes if duty_planner else writes,
+    )
+
+
+def run_batch(traces, policies=None, **kwargs):
+    """{(nombre de traza, nombre de política): SimResult} para todas las combinaciones."""
+    policies = policies or default_policies()
+    return {
+        (trace_name, policy_name): simulate(trace, policy, **kwargs)
+        for trace_name, trace in traces.items()
+        for policy_name, policy in policies.items()
+    }
+
+
+def summarize(results):
+    """Agrega un batch por política: peor pico, medias del resto y totales de escrituras."""
+    by_policy = {}
+    for (_, policy_name), r in results.items():
+        by_policy.setdefault(policy_name, []).append(r)
+    summary = {}
+    for name, rs in by_policy.items():
+        n = len(rs)
+        summary[name] = SimResult(
+            peak_temp=max(r.peak_temp for r in rs),
+            mean_temp=sum(r.mean_temp for r in rs) / n,
+            time_warn=sum(r.time_warn for r in rs) / n,
+            time_crit=sum(r.time_crit for r in rs) / n,
+            mean_pwm=sum(r.mean_pwm for r in rs) / n,
+            duty_changes=sum(r.duty_changes for r in rs),
+            i2c_writes=sum(r.i2c_writes for r in rs),
+        )
+    return summary
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    paths = sys.argv[1:]
+    if paths:
+        traces = {os.path.basename(p): load_trace(p) for p in paths}
+    else:
+        traces = {f"sintética {seed}": synthetic_trace(seed=seed) for seed in range(1, 9)}
+
+    started = time.perf_counter()
+    results = run_batch(traces)
+    elapsed = time.perf_counter() - started
+    ticks = sum(len(t) for t in traces.values()) * len(default_policies())
+
+    print(f"{len(traces)} trazas x {len(default_policies())} políticas: "
+          f"{elapsed:.2f} s ({elapsed / ticks * 1e6:.1f} us/tick)")
+    print(f"{'política':<18} {'pico':>6} {'media':>6} {'>WARN s':>8} {'>CRIT s':>8} "
+          f"{'PWM':>6} {'cambios':>8} {'I2C':>6}")
+    for name, r in summarize(results).items():
+        print(f"{name:<18} {r.peak_temp:6.1f} {r.mean_temp:6.1f} {r.time_warn:8.0f} {r.time_crit:8.0f} "
+              f"{r.mean_pwm:6.1f} {r.duty_changes:8d} {r.i2c_writes:6d}")
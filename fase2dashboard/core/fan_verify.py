@@ -0,0 +1,120 @@
+import glob
+import os
+from collections import namedtuple
+from config.settings import (
+    FAN_VERIFY_TOLERANCE, FAN_VERIFY_CONFIRM, FAN_STALL_PWM, FAN_STALL_RPM,
+)
+
+# Lectura del ventilador de la propia Pi: PWM que aplica el firmware y
+# tacómetro en RPM.
+TachReading = namedtuple("TachReading", ["pwm", "rpm"])
+
+
+class FanTach:
+    """
+    pwm1 y fan1_input del hwmon de cooling_fan (ventilador oficial de la Pi).
+
+    Los ficheros se localizan una vez y se releen con pread, como
+    ThermalSensor. En placas sin ese ventilador `available` es False y
+    read() devuelve None.
+    """
+
+    HWMON_GLOB = "/sys/devices/platform/cooling_fan/hwmon/hwmon*"
+
+    def __init__(self, directory=None):
+        self._fds = None
+        for path in ([directory] if directory else sorted(glob.glob(self.HWMON_GLOB))):
+            try:
+                pwm_fd = os.open(os.path.join(path, "pwm1"), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                rpm_fd = os.open(os.path.join(path, "fan1_input"), os.O_RDONLY)
+            except OSError:
+                os.close(pwm_fd)
+                continue
+            self._fds = (pwm_fd, rpm_fd)
+            break
+
+    @property
+    def available(self):
+        return self._fds is not None
+
+    def read(self):
+        if self._fds is None:
+            return None
+        try:
+            return TachReading(int(os.pread(self._fds[0], 16, 0)), int(os.pread(self._fds[1], 16, 0)))
+        except (OSError, ValueError):
+            return None
+
+    def close(self):
+        if self._fds is not None:
+            for fd in self._fds:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            self._fds = None
+
+    def __del__(self):
+        self.close()
+
+
+class FanVerifier:
+    """
+    Verificación en lazo cerrado de la refrigeración activa.
+
+    En cada check() se compara:
+    - el duty pedido a cada ventilador de la placa con el que devuelve
+      get_fanN_duty() (None si la lectura I2C ha fallado),
+    - y, si hay tacómetro, que el ventilador de la Pi gire cuando su PWM
+      pasa de `stall_pwm`.
+
+    Un fallo tiene que repetirse `confirm` comprobaciones seguidas para
+    contar (evita falsos positivos por una lectura suelta o por el arranque
+    del ventilador). check() devuelve la lista de fallos confirmados; la
+    primera vez que no está vacía queda guardada en `tripped`.
+    """
+
+    def __init__(self, tolerance=FAN_VERIFY_TOLERANCE, confirm=FAN_VERIFY_CONFIRM,
+                 stall_pwm=FAN_STALL_PWM, stall_rpm=FAN_STALL_RPM):
+        self.tolerance = tolerance
+        self.confirm = confirm
+        self.stall_pwm = stall_pwm
+        self.stall_rpm = stall_rpm
+        self.checks = 0
+        self.suspects = 0       # comprobaciones con algún fallo sin confirmar
+        self.tripped = None
+        self._streak = {}       # ventilador -> comprobaciones seguidas con fallo
+
+    def reset(self):
+        self._streak = {}
+        self.tripped = None
+
+    def _observe(self, commanded, read0, read1, tach):
+        """{ventilador: descripción} de lo que no cuadra en esta comprobación."""
+        seen = {}
+        for name, wanted, got in (("fan0", commanded[0], read0), ("fan1", commanded[1], read1)):
+            if wanted is None:
+                continue
+            if got is None:
+                seen[name] = f"{name}: sin respuesta I2C"
+            elif abs(got - wanted) > self.tolerance:
+                seen[name] = f"{name}: duty {got} != {wanted}"
+        if tach is not None and tach.pwm >= self.stall_pwm and tach.rpm < self.stall_rpm:
+            seen["pi"] = f"pi: parado ({tach.rpm} rpm a PWM {tach.pwm})"
+        return seen
+
+    def check(self, commanded, read0, read1, tach=None):
+        """`commanded` es (duty0, duty1) escrito por última vez (None = aún nada)."""
+        self.checks += 1
+        seen = self._observe(commanded, read0, read1, tach)
+        if seen:
+            self.suspects += 1
+        # La racha es por ventilador: una comprobación buena la reinicia
+        self._streak = {name: self._streak.get(name, 0) + 1 for name in seen}
+        confirmed = [seen[name] for name, n in self._streak.items() if n >= self.confirm]
+        if confirmed and self.tripped is None:
+            self.tripped = confirmed
+        return confirmed
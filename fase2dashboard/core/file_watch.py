@@ -0,0 +1,179 @@
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import struct
+import threading
+
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY      = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_Q_OVERFLOW  = 0x00004000
+IN_NONBLOCK    = 0o4000
+IN_CLOEXEC     = 0o2000000
+
+# Se vigila el directorio y no el fichero: os.replace cambia el inode y una
+# vigilancia sobre el fichero se perdería con la primera escritura atómica.
+_DIR_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")   # wd, mask, cookie, len
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class _Inotify:
+    """Envoltorio mínimo de inotify sobre libc con ctypes (fd no bloqueante)."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+    def add_watch(self, path, mask):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {path}")
+        return wd
+
+    def read_events(self):
+        """Eventos pendientes como (wd, mask, nombre). Lista vacía si no hay nada."""
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 4096)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return events
+                raise
+            offset = 0
+            while offset + _EVENT.size <= len(buf):
+                wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                name = buf[offset:offset + length].split(b"\0", 1)[0]
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WatchedFile:
+    """
+    Un fichero vigilado: get() devuelve el objeto cacheado y solo vuelve a
+    parsear cuando el fichero ha cambiado. `reloads` cuenta los parseos.
+    """
+
+    def __init__(self, watcher, path, loader, default):
+        self.path = path
+        self._watcher = watcher
+        self._loader = loader
+        self._default = default
+        self._value = default
+        self._stat_key = None
+        self.dirty = True
+        self.inotify = False     # lo decide FileWatcher al registrarlo
+        self.reloads = 0
+
+    def _stat_changed(self):
+        try:
+            st = os.stat(self.path)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            key = None
+        if key == self._stat_key:
+            return False
+        self._stat_key = key
+        return True
+
+    def get(self):
+        if self.inotify:
+            self._watcher.poll()
+        elif self._stat_changed():
+            self.dirty = True
+
+        if self.dirty:
+            self.dirty = False
+            self.reloads += 1
+            try:
+                self._value = self._loader(self.path)
+            except Exception:
+                self._value = self._default
+        return self._value
+
+
+class FileWatcher:
+    """
+    Recarga de ficheros de estado guiada por inotify.
+
+    Todos los ficheros comparten un descriptor inotify; cada get() solo hace
+    un read() no bloqueante que casi siempre vuelve vacío. Si inotify no
+    está disponible (o el directorio aún no existe) ese fichero pasa a
+    comparar (inode, mtime, tamaño) con os.stat en cada lectura.
+    """
+
+    def __init__(self, use_inotify=True):
+        self._lock = threading.Lock()
+        self._inotify = None
+        self._dirs = {}       # wd -> directorio
+        self._wds = {}        # directorio -> wd
+        self._files = {}      # (directorio, nombre) -> [WatchedFile]
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+
+    @property
+    def backend(self):
+        return "inotify" if self._inotify else "stat"
+
+    def fileno(self):
+        """Descriptor inotify (para select) o None si se usa stat."""
+        return self._inotify.fd if self._inotify else None
+
+    def watch(self, path, loader=load_json, default=None):
+        wf = WatchedFile(self, path, loader, default)
+        directory, name = os.path.split(os.path.abspath(path))
+        if self._inotify:
+            with self._lock:
+                try:
+                    if directory not in self._wds:
+                        wd = self._inotify.add_watch(directory, _DIR_MASK)
+                        self._wds[directory] = wd
+                        self._dirs[wd] = directory
+                    self._files.setdefault((directory, name), []).append(wf)
+                    wf.inotify = True
+                except OSError:
+                    pass
+        return wf
+
+    def poll(self):
+        """Lee los eventos pendientes y marca como sucios los ficheros afectados."""
+        if not self._inotify:
+            return
+        with self._lock:
+            for wd, mask, name in self._inotify.read_events():
+                if mask & IN_Q_OVERFLOW:
+                    # Se han perdido eventos: recargar todo por si acaso
+                    for files in self._files.values():
+                        for wf in files:
+                            wf.dirty = True
+                    continue
+                for wf in self._files.get((self._dirs.get(wd), name), ()):
+                    wf.dirty = True
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
@@ -0,0 +1,114 @@
+import heapq
+import time
+
+
+class PeriodicJob:
+    __slots__ = ("name", "period", "func", "deadline", "runs", "overruns", "last_duration")
+
+    def __init__(self, name, period, func, deadline):
+        self.name = name
+        self.period = period
+        self.func = func
+        self.deadline = deadline
+        self.runs = 0
+        self.overruns = 0
+        self.last_duration = 0.0
+
+
+class JobScheduler:
+    """
+    Planificador de tareas periódicas ordenado por el próximo vencimiento.
+
+    Las tareas se guardan en un heap (deadline, orden de alta, tarea) y los
+    vencimientos avanzan en múltiplos exactos del periodo sobre un reloj
+    monotónico, así que no acumulan deriva. Entre vencimientos el bucle
+    duerme justo hasta el siguiente.
+
+    Si una tarea se retrasa tanto que se salta uno o más periodos se cuenta
+    un overrun y se reprograma al siguiente múltiplo en el futuro en lugar
+    de ejecutarla varias veces seguidas.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._heap = []
+        self._seq = 0
+        self.jobs = {}
+
+    def add_job(self, name, period, func, first_delay=0.0):
+        job = PeriodicJob(name, period, func, self._clock() + first_delay)
+        self.jobs[name] = job
+        heapq.heappush(self._heap, (job.deadline, self._seq, job))
+        self._seq += 1
+        return job
+
+    def set_period(self, name, period):
+        """
+        Cambia el periodo de una tarea. Si su próximo vencimiento queda más
+        lejos que el nuevo periodo se adelanta (p. ej. al activar un efecto LED).
+        """
+        job = self.jobs[name]
+        job.period = period
+        deadline = self._clock() + period
+        if job.deadline > deadline:
+            job.deadline = deadline
+            self._heap = [(j.deadline, seq, j) for _, seq, j in self._heap]
+            heapq.heapify(self._heap)
+
+    def time_to_next(self):
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self._clock())
+
+    def run_pending(self):
+        """Ejecuta las tareas vencidas. Devuelve los segundos hasta el siguiente vencimiento."""
+        now = self._clock()
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, job = heapq.heappop(self._heap)
+
+            started = self._clock()
+            try:
+                job.func()
+            except Exception as e:
+                print(f"[scheduler] Error en tarea '{job.name}': {e}")
+            finished = self._clock()
+            job.last_duration = finished - started
+            job.runs += 1
+
+            job.deadline += job.period
+            if job.deadline <= finished:
+                missed = int((finished - job.deadline) // job.period) + 1
+                job.overruns += missed
+                job.deadline += missed * job.period
+
+            heapq.heappush(self._heap, (job.deadline, seq, job))
+            now = self._clock()
+
+        return self.time_to_next()
+
+    def run(self, should_stop, wait=None):
+        """
+        Bucle principal: ejecutar lo vencido y dormir hasta el próximo vencimiento.
+
+        Si se pasa `wait(segundos)` se usa en lugar de dormir, para atender
+        E/S (p. ej. el socket de control) mientras se espera.
+        """
+        wait = wait or self._sleep
+        while not should_stop():
+            delay = self.run_pending()
+            if delay is None:
+                break
+            if delay > 0:
+                wait(delay)
+
+    def stats(self):
+        return {
+            name: {
+                "period": job.period,
+                "runs": job.runs,
+                "overruns": job.overruns,
+                "last_duration": job.last_duration,
+            }
+            for name, job in self.jobs.items()
+        }
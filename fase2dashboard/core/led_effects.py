@@ -0,0 +1,257 @@
+import colorsys
+import math
+import time
+from collections import Counter, deque
+from config.settings import LED_COUNT, LED_FPS, LED_MAX_FPS, LED_MAX_WRITES_PER_S
+
+
+# -----------------------------
+# ---------- Efectos ----------
+# -----------------------------
+# Un efecto es una función (t, n, params, context) -> [(r, g, b)] * n:
+# `t` son los segundos desde que arrancó, `params` sus parámetros ya
+# validados (parse_params) y `context` lecturas de fase1 ({"temp": ..,
+# "cpu": ..}). Colores enteros 0-255 para que el diff contra lo enviado sea
+# exacto.
+def _color(params):
+    return tuple(int(params[k]) for k in "rgb")
+
+
+def _scale(color, k):
+    return tuple(int(c * k) for c in color)
+
+
+def effect_chase(t, n, params, context):
+    """Cometa que recorre los LEDs con estela."""
+    color = _color(params)
+    head = (t * params["speed"]) % n
+    return [_scale(color, max(0.0, 1.0 - ((head - i) % n) / params["tail"])) for i in range(n)]
+
+
+def effect_rainbow(t, n, params, context):
+    """Arcoíris calculado aquí (el modo 4 del firmware no deja elegir velocidad)."""
+    frame = []
+    for i in range(n):
+        r, g, b = colorsys.hsv_to_rgb((t * params["speed"] + i / n) % 1.0, 1.0, 1.0)
+        frame.append((int(r * 255), int(g * 255), int(b * 255)))
+    return frame
+
+
+def effect_pulse(t, n, params, context):
+    """Respiración de un color, igual en todos los LEDs."""
+    level = 0.5 - 0.5 * math.cos(2 * math.pi * t / params["period"])
+    return [_scale(_color(params), level)] * n
+
+
+def effect_temp_bar(t, n, params, context):
+    """Barra de temperatura: se encienden más LEDs (y más rojos) cuanto más caliente."""
+    temp = (context or {}).get("temp") or 0.0
+    low, high = params["low"], params["high"]
+    ratio = max(0.0, min(1.0, (temp - low) / (high - low)))
+    lit = max(1, int(math.ceil(ratio * n)))
+    color = (int(255 * ratio), int(255 * (1 - ratio)), 0)
+    return [color if i < lit else (0, 0, 0) for i in range(n)]
+
+
+EFFECTS = {
+    "chase": effect_chase,
+    "rainbow": effect_rainbow,
+    "pulse": effect_pulse,
+    "temp_bar": effect_temp_bar,
+}
+
+# Parámetros de cada efecto: clave -> (por defecto, mínimo, máximo), None =
+# sin límite. Fuera de rango se recorta; lo que no es un número rechaza el
+# led_state entero.
+_RGB = {"r": (0, 0, 255), "g": (255, 0, 255), "b": (0, 0, 255)}
+EFFECT_PARAMS = {
+    "chase": {"speed": (4.0, None, None), "tail": (2.0, 1.0, None), **_RGB},   # LEDs por segundo
+    "rainbow": {"speed": (0.2, None, None)},                                   # vueltas por segundo
+    "pulse": {"period": (3.0, 0.2, None), **_RGB},
+    "temp_bar": {"low": (40.0, None, None), "high": (75.0, None, None)},
+}
+
+
+def parse_params(name, state):
+    """Parámetros de `name` sacados de `state`, convertidos una vez. ValueError si alguno no vale."""
+    params = {}
+    for key, (default, low, high) in EFFECT_PARAMS[name].items():
+        raw = state.get(key, default)
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: {key}={raw!r} no es un número")
+        if not math.isfinite(value):
+            raise ValueError(f"{name}: {key}={raw!r} no es un número finito")
+        if low is not None:
+            value = max(low, value)
+        if high is not None:
+            value = min(high, value)
+        params[key] = value
+    if "low" in params and params["high"] <= params["low"]:
+        raise ValueError(f"{name}: high ({params['high']}) tiene que ser mayor que low ({params['low']})")
+    return params
+
+
+# -----------------------------
+# ---------- Motor ----------
+# -----------------------------
+class LedEffectEngine:
+    """
+    Efectos LED calculados en el host y enviados por I2C frame a frame.
+
+    tick() renderiza un frame y lo compara con lo último enviado a la
+    placa; solo se escriben los LEDs que han cambiado (REG_LED_SPECIFIED).
+    Si sale más barato, se usa un REG_LED_ALL con el color más repetido y
+    después se corrigen los LEDs que no lo tienen (un frame uniforme es una
+    sola escritura).
+
+    Un cubo de `max_writes_per_s` escrituras por segundo protege el bus que
+    comparte el OLED: un frame que no cabe se salta entero y el siguiente
+    diff ya incluye lo que faltaba.
+    """
+
+    STATS_WINDOW = 5.0   # segundos para writes_per_s()
+
+    def __init__(self, board, count=LED_COUNT, max_writes_per_s=LED_MAX_WRITES_PER_S,
+                 clock=time.monotonic):
+        self._board = board
+        self.count = count
+        self.max_writes_per_s = max_writes_per_s
+        self._clock = clock
+        self._effect = None
+        self._name = None
+        self._params = {}
+        self._rejected = None           # último led_state rechazado (para avisar una sola vez)
+        self._t0 = 0.0
+        self.fps = LED_FPS
+        self._pushed = [None] * count   # último color enviado por LED (None = desconocido)
+        self._capacity = max(count + 1, max_writes_per_s / 4.0)
+        self._tokens = self._capacity
+        self._refill_ts = clock()
+        self._window = deque()          # (ts, escrituras) de los últimos STATS_WINDOW s
+        self.frames = 0
+        self.frames_unchanged = 0
+        self.frames_skipped = 0
+        self.writes = 0
+
+    @property
+    def active(self):
+        return self._effect is not None
+
+    def configure(self, state):
+        """
+        Aplica un led_state {"mode": "effect", "effect": .., "fps": .., ...}.
+        Devuelve True si cambia el efecto o los FPS (hay que reprogramar el tick).
+
+        Los parámetros se validan aquí y no en cada frame: si alguno no vale
+        se avisa y se sigue con el efecto que hubiera.
+        """
+        name = state.get("effect")
+        effect = EFFECTS.get(name)
+        try:
+            fps = max(1.0, min(float(LED_MAX_FPS), float(state.get("fps", LED_FPS))))
+        except (TypeError, ValueError):
+            fps = float(LED_FPS)
+        if effect is None:
+            changed = self.active
+            self.stop()
+            return changed
+        try:
+            params = parse_params(name, state)
+        except ValueError as e:
+            if state != self._rejected:
+                print(f"[led_effects] led_state rechazado: {e}")
+                self._rejected = dict(state)
+            return False
+        self._rejected = None
+        changed = name != self._name or fps != self.fps
+        if name != self._name:
+            self._t0 = self._clock()
+        self._effect, self._name, self._params, self.fps = effect, name, params, fps
+        return changed
+
+    def stop(self):
+        self._effect = None
+        self._name = None
+
+    def invalidate(self):
+        """Los colores de la placa ya no son los enviados (cambio de modo del firmware)."""
+        self._pushed = [None] * self.count
+
+    def _plan(self, frame):
+        """Escrituras para pasar de lo enviado a `frame`: [(led, color)], led None = todos."""
+        individual = [(i, c) for i, c in enumerate(frame) if c != self._pushed[i]]
+        if len(individual) < 2:
+            return individual
+        common = Counter(frame).most_common(1)[0][0]
+        via_all = [(None, common)] + [(i, c) for i, c in enumerate(frame) if c != common]
+        return via_all if len(via_all) < len(individual) else individual
+
+    def tick(self, context=None):
+        """Renderiza y envía un frame. Devuelve las escrituras I2C hechas."""
+        if self._effect is None:
+            return 0
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._refill_ts) * self.max_writes_per_s)
+        self._refill_ts = now
+        self.frames += 1
+
+        frame = self._effect(now - self._t0, self.count, self._params, context)
+        plan = self._plan(frame)
+        if not plan:
+            self.frames_unchanged += 1
+            return 0
+        if len(plan) > self._tokens:
+            self.frames_skipped += 1
+            return 0
+
+        for led, (r, g, b) in plan:
+            if led is None:
+                self._board.set_all_led_color(r, g, b)
+            else:
+                self._board.set_led_color(led, r, g, b)
+        self._pushed = list(frame)
+        self._tokens -= len(plan)
+        self.writes += len(plan)
+        self._window.append((now, len(plan)))
+        return len(plan)
+
+    def writes_per_s(self, now=None):
+        now = now if now is not None else self._clock()
+        while self._window and now - self._window[0][0] > self.STATS_WINDOW:
+            self._window.popleft()
+        return sum(n for _, n in self._window) / self.STATS_WINDOW
+
+
+def benchmark(seconds=60, fps=LED_FPS):
+    """
+    Escrituras I2C por segundo de cada efecto: diff + REG_LED_ALL frente a
+    escribir los LED_COUNT LEDs en cada frame.
+    """
+    class CountingBoard:
+        def __init__(self):
+            self.writes = 0
+
+        def set_led_color(self, led, r, g, b):
+            self.writes += 1
+
+        def set_all_led_color(self, r, g, b):
+            self.writes += 1
+
+    results = {}
+    for name in EFFECTS:
+        clock = [0.0]
+        engine = LedEffectEngine(CountingBoard(), clock=lambda: clock[0], max_writes_per_s=10**6)
+        engine.configure({"effect": name, "fps": fps})
+        for k in range(int(seconds * fps)):
+            clock[0] = k / fps
+            engine.tick({"temp": 40.0 + 35.0 * k / (seconds * fps)})
+        results[name] = (engine.writes / seconds, LED_COUNT * fps)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'efecto':<10} {'con diff':>10} {'sin diff':>10}  (escrituras/s a {LED_FPS} fps)")
+    for name, (diffed, naive) in benchmark().items():
+        print(f"{name:<10} {diffed:10.1f} {naive:10.1f}")
@@ -0,0 +1,155 @@
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from core.cpu_stats import CpuTimes
+
+
+# -----------------------------
+# ---------- Layout ----------
+# -----------------------------
+# Segmento de memoria compartida (tmpfs en /dev/shm) con un struct de tamaño
+# fijo. Lo escribe fase1 y lo lee el dashboard sin volver a muestrear.
+#
+#   cabecera : magic(4s) version(H) ncores(H) seq(Q)
+#   payload  : ts(d) ram(d) temp(d) chassis_temp(d)
+#              fan0_pwm(H) fan1_pwm(H) fan0_real(H) fan1_real(H)
+#              led_mode(12s) led_r(B) led_g(B) led_b(B) pad(x)
+#              cpu_total(6f) cpu_cores(MAX_CORES x 6f)
+#
+# `seq` es un seqlock: el escritor lo pone impar antes de tocar el payload y
+# par al terminar. El lector descarta la lectura si lo ve impar o si cambia
+# mientras copiaba los campos.
+BUS_PATH = "/dev/shm/proyectopantallas_metrics"
+MAGIC = b"PPMB"
+VERSION = 1
+MAX_CORES = 8
+
+_HEADER = struct.Struct("<4sHHQ")
+_SEQ_OFFSET = 8
+_SEQ = struct.Struct("<Q")
+_PAYLOAD = struct.Struct("<dddd HHHH 12sBBBx " + "f" * (6 * (MAX_CORES + 1)))
+_PAYLOAD_OFFSET = _HEADER.size
+BUS_SIZE = _HEADER.size + _PAYLOAD.size
+
+BusSample = namedtuple("BusSample", [
+    "seq", "ts",
+    "cpu", "cpu_detail", "cpu_cores",
+    "ram", "temp", "chassis_temp",
+    "fan0_pwm", "fan1_pwm", "fan0_real", "fan1_real",
+    "led_mode", "led_rgb",
+])
+
+
+class MetricsBusWriter:
+    """Lado productor (fase1): crea el segmento y publica con seqlock."""
+
+    def __init__(self, path=BUS_PATH):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, BUS_SIZE)
+            self._mm = mmap.mmap(fd, BUS_SIZE, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        self._seq = 0
+        _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, self._seq)
+
+    def publish(self, cpu_total, cpu_cores, ram, temp, chassis_temp=0.0,
+                fan0_pwm=0, fan1_pwm=0, fan0_real=0, fan1_real=0,
+                led_mode="", led_rgb=(0, 0, 0)):
+        cores = list(cpu_cores)[:MAX_CORES]
+        cpu_values = list(cpu_total)
+        for core in cores:
+            cpu_values.extend(core)
+        cpu_values.extend([0.0] * (6 * (MAX_CORES + 1) - len(cpu_values)))
+
+        # seqlock: impar = escritura en curso
+        self._seq += 1
+        _SEQ.pack_into(self._mm, _SEQ_OFFSET, self._seq)
+
+        _PAYLOAD.pack_into(
+            self._mm, _PAYLOAD_OFFSET,
+            time.time(), ram, temp, chassis_temp or 0.0,
+            int(fan0_pwm or 0), int(fan1_pwm or 0), int(fan0_real or 0), int(fan1_real or 0),
+            (led_mode or "").encode()[:12], *(int(c) & 0xFF for c in led_rgb),
+            *cpu_values
+        )
+        _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, len(cores), self._seq + 1)
+        self._seq += 1
+
+    def close(self):
+        self._mm.close()
+
+
+class MetricsBusReader:
+    """
+    Lado consumidor (dashboard). Abre el segmento en cuanto exista y lo lee
+    directamente desde el mmap; no hay ficheros ni JSON de por medio.
+    """
+
+    def __init__(self, path=BUS_PATH, retries=5):
+        self.path = path
+        self.retries = retries
+        self._mm = None
+
+    def _attach(self):
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            if os.fstat(fd).st_size < BUS_SIZE:
+                return False
+            self._mm = mmap.mmap(fd, BUS_SIZE, mmap.MAP_SHARED, mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        return True
+
+    def read(self):
+        """Última muestra consistente, o None si el bus no existe o no hay lectura estable."""
+        if self._mm is None and not self._attach():
+            return None
+
+        mm = self._mm
+        for _ in range(self.retries):
+            magic, version, ncores, seq1 = _HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version != VERSION:
+                return None
+            if seq1 == 0:
+                return None   # el productor aún no ha publicado nada
+            if seq1 & 1:
+                continue
+            values = _PAYLOAD.unpack_from(mm, _PAYLOAD_OFFSET)
+            seq2 = _SEQ.unpack_from(mm, _SEQ_OFFSET)[0]
+            if seq1 == seq2:
+                break
+        else:
+            return None
+
+        ts, ram, temp, chassis_temp, f0, f1, r0, r1, led_mode, lr, lg, lb = values[:12]
+        cpu_values = values[12:]
+        cpu_total = CpuTimes(*cpu_values[:6])
+        cpu_cores = tuple(
+            CpuTimes(*cpu_values[6 * (i + 1):6 * (i + 2)]) for i in range(ncores)
+        )
+        return BusSample(
+            seq=seq1, ts=ts,
+            cpu=cpu_total.busy, cpu_detail=cpu_total, cpu_cores=cpu_cores,
+            ram=ram, temp=temp, chassis_temp=chassis_temp,
+            fan0_pwm=f0, fan1_pwm=f1, fan0_real=r0, fan1_real=r1,
+            led_mode=led_mode.rstrip(b"\x00").decode(), led_rgb=(lr, lg, lb),
+        )
+
+    def read_fresh(self, max_age):
+        """Como read(), pero devuelve None si la muestra tiene más de `max_age` segundos."""
+        sample = self.read()
+        if sample is None or time.time() - sample.ts > max_age:
+            return None
+        return sample
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
@@ -0,0 +1,132 @@
+import heapq
+import os
+import time
+from collections import namedtuple
+
+
+ProcInfo = namedtuple("ProcInfo", ["pid", "name", "cpu", "rss_mb"])
+
+# Índices dentro de /proc/<pid>/stat a partir del campo 3 (después de "(comm)")
+_UTIME, _STIME, _STARTTIME, _RSS = 11, 12, 19, 21
+
+
+class ProcessScanner:
+    """
+    Escaneo incremental de /proc para el top de procesos.
+
+    Por cada PID se guarda (ticks de CPU, starttime, nombre, rss) entre
+    pasadas, y en cada tick solo se lee /proc/<pid>/stat: nada de status,
+    cmdline ni psutil.Process. Los PIDs que desaparecen se descartan y un
+    starttime distinto indica PID reutilizado. El top-N se saca con un heap,
+    así que el coste por tick es una lectura corta por proceso.
+    """
+
+    def __init__(self, proc_root="/proc", top_n=8):
+        self.proc_root = proc_root
+        self.top_n = top_n
+        self._clk_tck = os.sysconf("SC_CLK_TCK")
+        self._page_mb = os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+        self._state = {}        # pid -> [ticks, starttime, name, rss_pages, cpu%]
+        self._last_scan = None
+        self.last_scan_cost = 0.0
+        self.process_count = 0
+
+    @staticmethod
+    def _read_stat(path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.read(fd, 1024)
+        finally:
+            os.close(fd)
+
+    def scan(self):
+        """Recorre /proc y actualiza el estado por PID. Devuelve (top_cpu, top_rss)."""
+        started = time.perf_counter()
+        now = time.monotonic()
+        elapsed = now - self._last_scan if self._last_scan is not None else None
+        self._last_scan = now
+
+        state = self._state
+        seen = set()
+        root = self.proc_root
+
+        for entry in os.listdir(root):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            try:
+                data = self._read_stat(f"{root}/{entry}/stat")
+            except OSError:
+                continue   # el proceso terminó entre listdir y la lectura
+
+            head, _, tail = data.rpartition(b")")
+            fields = tail.split()
+            try:
+                ticks = int(fields[_UTIME]) + int(fields[_STIME])
+                starttime = int(fields[_STARTTIME])
+                rss = int(fields[_RSS])
+            except (IndexError, ValueError):
+                continue
+            seen.add(pid)
+
+            prev = state.get(pid)
+            if prev is None or prev[1] != starttime:
+                name = head[head.find(b"(") + 1:].decode(errors="replace")
+                state[pid] = [ticks, starttime, name, rss, 0.0]
+                continue
+
+            if elapsed:
+                prev[4] = (ticks - prev[0]) * 100.0 / (elapsed * self._clk_tck)
+            prev[0] = ticks
+            prev[3] = rss
+
+        # Descartar los PIDs que ya no existen
+        for pid in state.keys() - seen:
+            del state[pid]
+
+        self.process_count = len(state)
+        self.last_scan_cost = time.perf_counter() - started
+        return self.top()
+
+    def top(self):
+        items = self._state.items()
+        top_cpu = heapq.nlargest(self.top_n, items, key=lambda kv: kv[1][4])
+        top_rss = heapq.nlargest(self.top_n, items, key=lambda kv: kv[1][3])
+
+        def as_info(kv):
+            pid, (ticks, starttime, name, rss, cpu) = kv
+            return ProcInfo(pid, name, cpu, rss * self._page_mb)
+
+        return tuple(map(as_info, top_cpu)), tuple(map(as_info, top_rss))
+
+
+def benchmark(nprocs=600, rounds=20):
+    """Coste medio por pasada sobre un /proc sintético de `nprocs` procesos."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as root:
+        for pid in range(1, nprocs + 1):
+            os.mkdir(os.path.join(root, str(pid)))
+            fields = ["S"] + ["0"] * 10 + [str(pid), "0"] + ["0"] * 6 + [str(pid * 7), "0", str(pid % 5000)]
+            with open(os.path.join(root, str(pid), "stat"), "w") as f:
+                f.write(f"{pid} (proc {pid}) " + " ".join(fields) + "\n")
+
+        scanner = ProcessScanner(proc_root=root)
+        scanner.scan()
+        total = 0.0
+        for _ in range(rounds):
+            scanner.scan()
+            total += scanner.last_scan_cost
+        return total / rounds
+
+
+if __name__ == "__main__":
+    for n in (100, 500, 1000):
+        print(f"{n:>5} procesos: {benchmark(n) * 1000:7.2f} ms/pasada")
+    scanner = ProcessScanner()
+    scanner.scan()
+    time.sleep(1)
+    top_cpu, top_rss = scanner.scan()
+    print(f"/proc real: {scanner.process_count} procesos, {scanner.last_scan_cost * 1000:.2f} ms")
+    for p in top_cpu:
+        print(f"{p.pid:>7} {p.name:<16} {p.cpu:5.1f} % {p.rss_mb:8.1f} MB")
@@ -0,0 +1,279 @@
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+from config.settings import DATA_DIR, RUNTIME_DIRS
+
+
+# Ficheros de estado compartidos entre fase1 y el dashboard
+FAN_STATE = "fan_state.json"
+LED_STATE = "led_state.json"
+HW_STATE = "hardware_state.json"
+FAN_CURVE = "fan_curve.json"
+
+# Estado volátil que fase1 guarda en disco al salir y recupera al arrancar
+PERSISTENT_RUNTIME = (FAN_STATE, LED_STATE)
+
+
+def persisted_name(name):
+    """
+    Nombre de la copia en disco de un fichero volátil: "fan_state.json" ->
+    "fan_state.runtime.json". DATA_DIR/fan_state.json es el STATE_FILE del
+    dashboard antiguo (JSON plano), así que la copia con cabecera no puede
+    pisarlo.
+    """
+    base, ext = os.path.splitext(name)
+    return f"{base}.runtime{ext}"
+
+# -----------------------------
+# ---------- Cabecera ----------
+# -----------------------------
+# Cada documento de estado empieza por una línea ASCII de tamaño fijo:
+#   b"PPS1 <seq:10> <ts:17>\n"
+# con un número de secuencia que solo crece y la hora de escritura. Un
+# lector puede leer esos 34 bytes y saber si algo ha cambiado (y cuánto
+# lleva sin actualizarse el productor) sin decodificar el JSON.
+HEADER_MAGIC = b"PPS1"
+HEADER_SIZE = 34
+
+StateDoc = namedtuple("StateDoc", ["seq", "ts", "data"])
+
+
+def encode_header(seq, ts):
+    return b"%s %010d %017.6f\n" % (HEADER_MAGIC, seq % 10**10, ts)
+
+
+def decode_header(buf):
+    """(seq, ts) de una cabecera, o None si el documento no la tiene (JSON plano)."""
+    if len(buf) < HEADER_SIZE or not buf.startswith(HEADER_MAGIC):
+        return None
+    try:
+        return int(buf[5:15]), float(buf[16:33])
+    except ValueError:
+        return None
+
+
+def read_header(path):
+    """Solo la cabecera de `path`; None si no existe o no tiene."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        return decode_header(os.pread(fd, HEADER_SIZE, 0))
+    finally:
+        os.close(fd)
+
+
+def decode_doc(raw):
+    """StateDoc de un documento completo (seq 0 y ts 0 si es JSON sin cabecera)."""
+    header = decode_header(raw)
+    if header is None:
+        return StateDoc(0, 0.0, json.loads(raw))
+    return StateDoc(header[0], header[1], json.loads(raw[HEADER_SIZE:]))
+
+
+def load_doc(path):
+    with open(path, "rb") as f:
+        return decode_doc(f.read())
+
+
+def load_data(path):
+    """Loader para FileWatcher: solo los datos, con o sin cabecera."""
+    return load_doc(path).data
+
+
+def write_json_atomic(path, payload, durability="atomic"):
+    """
+    Escribe `payload` (bytes) en `path` con tmp + os.replace.
+
+    durability="atomic": el reemplazo es atómico pero los datos quedan en la
+    caché de páginas hasta que el kernel los vuelque.
+    durability="fsync": fsync del fichero y del directorio antes de volver.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        if durability == "fsync":
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if durability == "fsync":
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class StateStore:
+    """
+    Directorio de ficheros JSON de estado.
+
+    Cada backend decide dónde vive el directorio, con qué durabilidad se
+    escribe y si los documentos llevan cabecera con secuencia; los
+    consumidores solo usan nombres (FAN_STATE, FAN_CURVE...). La lectura
+    acepta documentos con y sin cabecera.
+    """
+
+    durability = "atomic"
+    headers = True
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._seq = {}   # nombre -> última secuencia escrita por este proceso
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def read(self, name, default=None):
+        try:
+            return load_data(self.path(name))
+        except Exception:
+            return default
+
+    def header(self, name):
+        return read_header(self.path(name))
+
+    def write_bytes(self, name, payload):
+        if self.headers:
+            # La secuencia continúa la del fichero actual, sea cual sea el
+            # proceso que lo escribió (fase1 o el fallback del dashboard).
+            current = self.header(name)
+            seq = max(self._seq.get(name, 0), current[0] if current else 0) + 1
+            self._seq[name] = seq
+            payload = encode_header(seq, time.time()) + payload
+        write_json_atomic(self.path(name), payload, self.durability)
+
+    def write(self, name, data, indent=None):
+        self.write_bytes(name, json.dumps(data, indent=indent).encode())
+
+    def watch(self, watcher, name, loader=load_data, default=None):
+        """WatchedFile sobre el fichero `name` de este almacén."""
+        return watcher.watch(self.path(name), loader=loader, default=default)
+
+    def reader(self, name, default=None):
+        return StateReader(self.path(name), default)
+
+
+class StateReader:
+    """
+    Lector de un documento de estado guiado por la cabecera.
+
+    get() lee solo los 34 bytes de cabecera y, si la secuencia no ha
+    cambiado, devuelve el StateDoc anterior sin abrir el JSON. age() dice
+    cuántos segundos lleva el productor sin escribir.
+    """
+
+    def __init__(self, path, default=None):
+        self.path = path
+        self._default = default
+        self._doc = StateDoc(None, 0.0, default)
+        self.header_checks = 0
+        self.reloads = 0
+
+    def get(self):
+        self.header_checks += 1
+        header = read_header(self.path)
+        if header is not None and header[0] == self._doc.seq:
+            return self._doc
+        try:
+            self._doc = load_doc(self.path)
+            self.reloads += 1
+        except Exception:
+            self._doc = StateDoc(None, 0.0, self._default)
+        return self._doc
+
+    @property
+    def seq(self):
+        return self._doc.seq
+
+    def age(self, now=None):
+        """Segundos desde la última escritura del productor (None si nunca ha escrito)."""
+        if not self._doc.ts:
+            return None
+        return (now if now is not None else time.time()) - self._doc.ts
+
+
+class DiskStateStore(StateStore):
+    """
+    Configuración duradera en la SD (curva): escrituras poco frecuentes con
+    fsync y JSON plano, sin cabecera, para poder editarlo a mano.
+    """
+
+    durability = "fsync"
+    headers = False
+
+    def __init__(self, directory=DATA_DIR):
+        super().__init__(directory)
+        os.makedirs(directory, exist_ok=True)
+
+
+class TmpfsStateStore(StateStore):
+    """
+    Estado volátil de alta frecuencia en tmpfs (/run o /dev/shm).
+
+    Se usa el primer candidato que ya exista y sea escribible; si ninguno
+    existe se crea el primero posible (abierto a todos, ya que fase1 y el
+    dashboard pueden correr con usuarios distintos). No sobrevive a un
+    reinicio: seed_from/persist_to copian el último estado conocido desde y
+    hacia un almacén en disco.
+    """
+
+    def __init__(self, candidates=RUNTIME_DIRS):
+        super().__init__(self._resolve(candidates))
+
+    @staticmethod
+    def _resolve(candidates):
+        for directory in candidates:
+            if os.path.isdir(directory) and os.access(directory, os.W_OK):
+                return directory
+        for directory in candidates:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                os.chmod(directory, 0o1777)
+                return directory
+            except OSError:
+                continue
+        raise OSError(f"Ningún directorio de estado utilizable: {candidates}")
+
+    def seed_from(self, store, names=PERSISTENT_RUNTIME):
+        """Copia desde `store` los ficheros que aún no existan aquí (primer arranque tras reiniciar)."""
+        for name in names:
+            saved = store.path(persisted_name(name))
+            if not os.path.exists(self.path(name)) and os.path.exists(saved):
+                try:
+                    shutil.copyfile(saved, self.path(name))
+                except OSError:
+                    pass
+
+    def persist_to(self, store, names=PERSISTENT_RUNTIME):
+        """Guarda en `store` el último estado conocido (al salir), con persisted_name()."""
+        for name in names:
+            try:
+                with open(self.path(name), "rb") as f:
+                    # Copia literal, con cabecera, para que la secuencia continúe
+                    write_json_atomic(store.path(persisted_name(name)), f.read(), store.durability)
+            except OSError:
+                pass
+
+
+_runtime_store = None
+_config_store = None
+
+
+def runtime_store():
+    """Almacén volátil compartido (el mismo directorio para fase1 y el dashboard)."""
+    global _runtime_store
+    if _runtime_store is None:
+        _runtime_store = TmpfsStateStore()
+    return _runtime_store
+
+
+def config_store():
+    """Almacén duradero de configuración."""
+    global _config_store
+    if _config_store is None:
+        _config_store = DiskStateStore()
+    return _config_store
@@ -0,0 +1,54 @@
+import threading
+
+
+class MetricSubscriptions:
+    """
+    Registro de quién necesita cada métrica y con qué frecuencia.
+
+    Cada consumidor (ventana, control de ventiladores...) se suscribe con un
+    nombre propio, la lista de métricas que usa y el intervalo que le basta.
+    Un colector solo se ejecuta mientras tenga algún suscriptor vivo y a la
+    frecuencia del suscriptor más exigente.
+    """
+
+    def __init__(self, on_change=None):
+        self._lock = threading.Lock()
+        self._subs = {}   # owner -> (frozenset(metrics), interval)
+        self._on_change = on_change
+
+    def subscribe(self, owner, metrics, interval):
+        with self._lock:
+            self._subs[owner] = (frozenset(metrics), interval)
+        if self._on_change:
+            self._on_change()
+
+    def unsubscribe(self, owner):
+        with self._lock:
+            removed = self._subs.pop(owner, None)
+        if removed and self._on_change:
+            self._on_change()
+
+    def intervals(self):
+        """{métrica: intervalo mínimo pedido} solo para las métricas con suscriptores."""
+        result = {}
+        with self._lock:
+            for metrics, interval in self._subs.values():
+                for metric in metrics:
+                    current = result.get(metric)
+                    if current is None or interval < current:
+                        result[metric] = interval
+        return result
+
+    def owners(self):
+        with self._lock:
+            return sorted(self._subs)
+
+    def bind_window(self, win, owner, metrics, interval):
+        """Suscribe mientras exista la ventana Tk `win`; se da de baja al destruirse."""
+        self.subscribe(owner, metrics, interval)
+
+        def on_destroy(event):
+            if event.widget is win:
+                self.unsubscribe(owner)
+
+        win.bind("<Destroy>", on_destroy, add="+")
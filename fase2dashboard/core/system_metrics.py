@@ -1,26 +1,52 @@
 import psutil
-import subprocess
-import re
+from core.thermal_sensor import ThermalSensor
+from core.cpu_stats import CpuStats
+from core.cpu_throttle import CpuThrottle
+from core.process_scanner import ProcessScanner
+from config.settings import PROC_TOP_N
+from services.disk_service import DiskService
 
 class SystemMetrics:
 
     def __init__(self):
         self._last_disk_io = psutil.disk_io_counters()
+        self._thermal = ThermalSensor()
+        self._cpu = CpuStats()
+        self._throttle = CpuThrottle()
+        self._processes = ProcessScanner(top_n=PROC_TOP_N)
+        self._disk_service = DiskService()
 
     def get_cpu_usage(self):
-        return psutil.cpu_percent()
+        return self._cpu.percent()
+
+    def get_cpu_count(self):
+        return self._cpu.ncores
+
+    def get_cpu_times(self):
+        """(total, cores): desglose user/system/iowait/irq/steal de la misma lectura."""
+        self._cpu.update()
+        return self._cpu.total, self._cpu.cores
+
+    def get_cpu_freq(self):
+        """Frecuencia de cada core en MHz."""
+        return self._throttle.read_freqs()
+
+    def get_cpu_max_freq(self):
+        return self._throttle.max_mhz
+
+    def get_throttle(self):
+        """ThrottleState del firmware (None si no disponible)."""
+        return self._throttle.read_throttled()
+
+    def get_top_processes(self):
+        """(top_cpu, top_rss): tuplas de ProcInfo del escaneo incremental de /proc."""
+        return self._processes.scan()
 
     def get_ram_usage(self):
         return psutil.virtual_memory().percent
 
     def get_cpu_temp(self):
-        try:
-            out = subprocess.check_output(
-                ["vcgencmd", "measure_temp"]
-            ).decode()
-            return float(out.replace("temp=", "").replace("'C\n", ""))
-        except:
-            return 0.0
+        return self._thermal.read()
 
     def get_disk_usage(self):
         return psutil.disk_usage('/').percent
@@ -43,17 +69,5 @@ class SystemMetrics:
         }
 
 
-    def get_disk_temp(self, device="/dev/nvme0n1"):
-        try:
-            out = subprocess.check_output(
-                ["sudo", "nvme", "smart-log", device],
-                stderr=subprocess.DEVNULL
-            ).decode()
-
-            # Buscar temperatura en formato "33°C"
-            match = re.search(r"temperature\s*:\s*(\d+)\s*°C", out, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-            return 0.0
-        except:
-            return 0.0
+    def get_disk_temp(self):
+        return self._disk_service.get_temp()
@@ -0,0 +1,164 @@
+import glob
+import os
+import shutil
+import subprocess
+import time
+
+
+class ThermalSensor:
+    """
+    Temperatura de CPU leída desde sysfs sin lanzar procesos.
+
+    El fichero del sensor (thermal_zone o hwmon) se abre una sola vez y se
+    relee con os.pread en cada consulta. Si no hay ningún sensor de CPU en
+    sysfs se recurre a `vcgencmd measure_temp`, y solo sin vcgencmd a una
+    thermal_zone de tipo desconocido. Las entradas hwmon que no son de CPU
+    (NVMe, placa...) no se usan nunca: llevarían la curva con otro sensor.
+    """
+
+    THERMAL_ZONE_GLOB = "/sys/class/thermal/thermal_zone*"
+    HWMON_GLOB = "/sys/class/hwmon/hwmon*"
+
+    # Tipos de zona / nombres hwmon que corresponden al SoC
+    CPU_SENSOR_NAMES = ("cpu-thermal", "cpu_thermal", "soc_thermal", "x86_pkg_temp", "coretemp", "k10temp")
+
+    def __init__(self, path=None):
+        self._path = path
+        self._fd = None
+        self._open()
+
+    # -----------------------------
+    # ---------- Descubrimiento ----------
+    # -----------------------------
+    @staticmethod
+    def _read_name(path):
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+    def _candidates(self):
+        """(sensores del SoC, thermal_zones de tipo desconocido), en orden."""
+        preferred = []
+        others = []
+
+        for zone in sorted(glob.glob(self.THERMAL_ZONE_GLOB)):
+            temp_path = os.path.join(zone, "temp")
+            if not os.path.exists(temp_path):
+                continue
+            if self._read_name(os.path.join(zone, "type")) in self.CPU_SENSOR_NAMES:
+                preferred.append(temp_path)
+            else:
+                others.append(temp_path)
+
+        for hwmon in sorted(glob.glob(self.HWMON_GLOB)):
+            temp_path = os.path.join(hwmon, "temp1_input")
+            if os.path.exists(temp_path) and self._read_name(os.path.join(hwmon, "name")) in self.CPU_SENSOR_NAMES:
+                preferred.append(temp_path)
+
+        return preferred, others
+
+    def _open(self):
+        if self._path:
+            self._open_first([self._path])
+            return
+        preferred, others = self._candidates()
+        if self._open_first(preferred) or shutil.which("vcgencmd"):
+            return
+        self._open_first(others)
+
+    def _open_first(self, paths):
+        """Abre el primer fichero de `paths` que se pueda leer. True si lo consigue."""
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                int(os.pread(fd, 16, 0))
+            except (OSError, ValueError):
+                os.close(fd)
+                continue
+            self._fd = fd
+            self._path = path
+            return True
+        self._fd = None
+        return False
+
+    # -----------------------------
+    # ---------- Lecturas ----------
+    # -----------------------------
+    def read_sysfs(self):
+        """Relee el descriptor abierto. Los valores vienen en miligrados."""
+        return int(os.pread(self._fd, 16, 0)) / 1000.0
+
+    @staticmethod
+    def read_vcgencmd():
+        out = subprocess.check_output(["vcgencmd", "measure_temp"]).decode()
+        return float(out.replace("temp=", "").replace("'C\n", ""))
+
+    def read(self, default=0.0):
+        """Temperatura en °C. Devuelve `default` si no hay ninguna fuente disponible."""
+        if self._fd is not None:
+            try:
+                return self.read_sysfs()
+            except (OSError, ValueError):
+                # El sensor ha desaparecido: cerrar y pasar al fallback
+                self.close()
+        try:
+            return self.read_vcgencmd()
+        except Exception:
+            return default
+
+    @property
+    def backend(self):
+        return "sysfs" if self._fd is not None else "vcgencmd"
+
+    @property
+    def path(self):
+        return self._path if self._fd is not None else None
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def __del__(self):
+        self.close()
+
+
+def benchmark(iterations=1000):
+    """Compara el coste por lectura de sysfs (pread) frente a vcgencmd."""
+    sensor = ThermalSensor()
+    results = {}
+
+    if sensor.backend == "sysfs":
+        start = time.perf_counter()
+        for _ in range(iterations):
+            sensor.read_sysfs()
+        results["sysfs"] = (time.perf_counter() - start) / iterations
+
+    # vcgencmd es lento: basta con pocas muestras
+    forks = max(1, iterations // 100)
+    try:
+        start = time.perf_counter()
+        for _ in range(forks):
+            ThermalSensor.read_vcgencmd()
+        results["vcgencmd"] = (time.perf_counter() - start) / forks
+    except Exception:
+        pass
+
+    sensor.close()
+    return results
+
+
+if __name__ == "__main__":
+    sensor = ThermalSensor()
+    print(f"Backend: {sensor.backend} ({sensor.path})")
+    print(f"Temperatura: {sensor.read():.1f} °C")
+    for name, per_call in benchmark().items():
+        print(f"{name:>9}: {per_call * 1e6:10.1f} µs/lectura")
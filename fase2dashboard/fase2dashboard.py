@@ -3,7 +3,6 @@ import customtkinter as ctk
 import psutil
 import subprocess
 from collections import deque
-import json
 import os
 import socket
 import logging
@@ -12,12 +11,19 @@ import re
 from functools import partial
 from config.settings import *
 from services.state_service import StateService
-from core.curve_logic import CurveLogic
+from core.curve_logic import CurveLogic, DEFAULT_CASE_CURVE
 from core.system_metrics import SystemMetrics
 from services.usb_service import UsbService
 from services.network_service import NetworkService
 from core.network_metrics import NetworkMetrics
 from services.speedtest_service import SpeedtestService
+from services.curve_tuner_service import CurveTunerService
+from services.metrics_sampler import MetricsSampler
+from core.metrics_bus import MetricsBusReader
+from core.control_channel import ControlClient
+from core.file_watch import FileWatcher
+from core.cpu_throttle import throttle_level, throttle_text
+from services.hardware_state_service import HardwareStateService
 
 
 
@@ -159,13 +165,26 @@ def custom_msgbox(parent, text, title="Info"):
 # -----------------------------
 # ---------- llamadas a modulos ----------
 # -----------------------------
-state_service = StateService()
-curve_logic = CurveLogic()
+# Órdenes de ventiladores por el socket de fase1 (fan_state.json solo si fase1 no escucha)
+control_client = ControlClient(CONTROL_SOCKET)
+file_watcher = FileWatcher()   # fan_state.json / fan_curve.json solo se releen al cambiar
+state_service = StateService(channel=control_client, watcher=file_watcher)
+curve_logic = CurveLogic(watcher=file_watcher)
 system_metrics = SystemMetrics()
 network_service = NetworkService()
 network_metrics = NetworkMetrics()
 speedtest_service = SpeedtestService()
+curve_tuner_service = CurveTunerService()
 usb_service = UsbService()
+hardware_service = HardwareStateService()
+metrics_bus = MetricsBusReader()
+metrics_sampler = MetricsSampler(
+    system_metrics, network_service, network_metrics, SAMPLER_INTERVAL,
+    bus_reader=metrics_bus, bus_max_age=METRICS_BUS_MAX_AGE,
+    usb_service=usb_service, hardware_service=hardware_service
+)
+# Las métricas solo se muestrean mientras haya una ventana abierta que las
+# use: el control de ventiladores vive en fase1.
 # -----------------------------
 # ---------- Graph helpers ----------
 # -----------------------------
@@ -250,6 +269,40 @@ def make_block_ctk(parent,title):
     return lbl,val,cvs
 
 
+def make_hw_blocks(parent):
+    """Bloques de temperatura de chasis y duty real leídos por fase1: [(lbl, val, cvs, lines)]."""
+    blocks = []
+    for title in ("CHASSIS TEMP °C", "FAN0 REAL %", "FAN1 REAL %"):
+        lbl, val, cvs = make_block_ctk(parent, title)
+        blocks.append((lbl, val, cvs, init_graph_lines(cvs, HISTORY, lbl.cget("text_color"))))
+    return blocks
+
+def render_hw_blocks(blocks, hw):
+    """Pinta los históricos de hardware_state; si fase1 no escribe hace rato lo marca en rojo."""
+    series = (
+        (chassis_hist, 85, "°C"),
+        (fan0_real_hist, 100, "%"),
+        (fan1_real_hist, 100, "%"),
+    )
+    for (lbl, val, cvs, lines), (hist, max_val, unit) in zip(blocks, series):
+        value = hist[-1]
+        if hw is None or hw.stale:
+            color = "#ff3333"
+            age = "nunca" if hw is None or hw.age is None else f"hace {hw.age:.0f}s"
+            text = f"{value:.0f} {unit} | SIN DATOS ({age})"
+        elif hw.fan_fault and unit == "%":
+            # fase1 ha devuelto los ventiladores al modo automático de la placa
+            color = "#ff3333"
+            text = f"{value:.0f} {unit} | FALLO: {hw.fan_fault}"
+        else:
+            color = level_color(value, TEMP_WARN, TEMP_CRIT) if unit == "°C" else "#00ffff"
+            text = f"{value:.0f} {unit}"
+        recolor_lines(cvs, lines, color)
+        update_graph_lines(cvs, lines, hist, max_val)
+        lbl.configure(text_color=color)
+        val.configure(text=text, text_color=color)
+
+
 def adaptive_disk_scale(current_max, data):
     global disk_idle_counter
     if not data:
@@ -281,17 +334,23 @@ def adaptive_disk_scale(current_max, data):
 
 
 last_storage_devices = set()  # global
+last_usb_devices = None       # última lista pintada (storage, others)
 
-def refresh_usb_devices():
+def refresh_usb_devices(devices=None):
     """
     Refresca los dispositivos USB en la ventana actual.
+    `devices` es la tupla (storage, others) ya muestreada; si no se pasa
+    se consulta en el momento (botón Refrescar).
     """
-    global usb_inner_frame, usb_devices_labels, usb_devices_buttons
+    global usb_inner_frame, usb_devices_labels, usb_devices_buttons, last_usb_devices
 
     if not usb_win or not usb_win.winfo_exists():
         return
 
-    storage, others = usb_service.list_all_usb_devices()
+    if devices is None:
+        devices = usb_service.list_all_usb_devices()
+    storage, others = devices
+    last_usb_devices = devices
 
     # Limpiar widgets antiguos (excepto botón refrescar)
     for key, lbl in list(usb_devices_labels.items()):
@@ -455,8 +514,10 @@ root.overrideredirect(True)
 # Variables de control
 mode_var = tk.StringVar(value="auto")
 manual_pwm = tk.IntVar(value=128)
+pid_setpoint = tk.IntVar(value=int(PID_SETPOINT))
 curve_vars=[]
 last_state=None
+last_state_version=None
 monitor_win = None
 control_fan_win = None
 # Históricos y líneas gráficas
@@ -466,6 +527,16 @@ temp_hist=deque([0]*HISTORY,maxlen=HISTORY)
 cpu_lines  = []
 ram_lines  = []
 temp_lines = []
+# Un histórico y un bloque (lbl, val, cvs, lines) por core
+cpu_core_hist = [deque([0]*HISTORY, maxlen=HISTORY) for _ in range(system_metrics.get_cpu_count())]
+cpu_core_blocks = []
+# Frecuencia (MHz, máximo entre cores) y nivel de throttling 0..3
+freq_hist = deque([0]*HISTORY, maxlen=HISTORY)
+throttle_hist = deque([0]*HISTORY, maxlen=HISTORY)
+freq_lbl = freq_val = freq_cvs = None
+throttle_lbl = throttle_val = throttle_cvs = None
+freq_lines = []
+throttle_lines = []
 
 disk_lbl = None
 disk_val = None
@@ -493,6 +564,13 @@ disk_read_dynamic_max = 1.0
 
 disk_idle_counter = 0
 
+# Estado real de la placa según fase1 (hardware_state.json)
+chassis_hist = deque([0]*HISTORY, maxlen=HISTORY)
+fan0_real_hist = deque([0]*HISTORY, maxlen=HISTORY)
+fan1_real_hist = deque([0]*HISTORY, maxlen=HISTORY)
+monitor_hw_blocks = []
+fan_hw_blocks = []
+
 # Red
 net_download_hist = deque([0]*HISTORY, maxlen=HISTORY) 
 net_upload_hist = deque([0]*HISTORY, maxlen=HISTORY) 
@@ -511,6 +589,10 @@ ips_frame = None       # frame donde estarán las IPs
 speedtest_running = False
 net_speed_test_lbl = None
 net_speed_test_val = None
+# ---------- Ventana procesos ----------
+proc_win = None
+proc_cpu_rows = []   # labels fijos; en cada tick solo se cambia el texto
+proc_rss_rows = []
 # ---------- Ventana monitor USB ----------
 usb_win = None
 usb_inner_frame = None  # Frame interno donde estarán los dispositivos
@@ -600,7 +682,7 @@ menu_inner.bind(
 bottom = ctk.CTkFrame(main, bg_color="#212121", width=DSI_WIDTH); bottom.pack(fill="x", expand=False, pady=4)
 make_futuristic_button(bottom, "Salir", root.destroy).pack(side="right", padx=10)
 def open_fan_control():
-    global mode_var, manual_pwm, curve_vars, control_fan_win
+    global mode_var, manual_pwm, pid_setpoint, curve_vars, control_fan_win, fan_hw_blocks
     
     if control_fan_win and control_fan_win.winfo_exists():
         control_fan_win.lift()
@@ -618,6 +700,14 @@ def open_fan_control():
     top = ctk.CTkFrame(main, bg_color="#212121"); top.pack(fill="both", expand=True, padx=6, pady=2)
     bottom = ctk.CTkFrame(main, bg_color="#212121"); bottom.pack(fill="x", padx=8, pady=4)
 
+    # -----------------------------
+    # ---------- Estado real (fase1) ----------
+    # -----------------------------
+    hw_frame = ctk.CTkFrame(top, bg_color="#212121")
+    hw_frame.pack(fill="x", pady=4)
+    fan_hw_blocks = make_hw_blocks(hw_frame)
+    metrics_sampler.subscriptions.bind_window(control_fan_win, "fan_hw", {"hw"}, SAMPLER_INTERVAL)
+
     # -----------------------------
     # ---------- Modo ----------
     # -----------------------------
@@ -636,11 +726,15 @@ def open_fan_control():
 
 
     def set_mode(mode):
-        """Actualiza modo y guarda en estado"""
+        """Actualiza modo y guarda en estado (fase1 calcula el PWM)"""
         mode_var.set(mode)
-        state_service.write_state({"mode":mode,"target_pwm":None})
+        target = int(manual_pwm.get()) if mode == "manual" else None
+        state = {"mode":mode,"target_pwm":target}
+        if mode == "pid":
+            state["setpoint"] = int(pid_setpoint.get())
+        state_service.write_state(state)
 
-    for m in ("auto", "silent", "normal", "performance", "manual"):
+    for m in ("auto", "pid", "silent", "normal", "performance", "manual"):
         rb = ctk.CTkRadioButton(
             modes_row,
             text=m.upper(),
@@ -700,10 +794,71 @@ def open_fan_control():
             ) if mode_var.get() == "manual" else None
     )
 
+    # -----------------------------
+    # ---------- Objetivo PID ----------
+    # -----------------------------
+    pid_frame = ctk.CTkFrame(top, bg_color="#212121")
+    pid_frame.pack(fill="x", pady=4)
+
+    pid_title = ctk.CTkLabel(
+        pid_frame,
+        text="Objetivo PID (°C)",
+        font=("FiraMono Nerd Font", 18, "bold")
+    )
+    pid_title.pack(anchor="w", padx=6, pady=(4, 2))
+
+    pid_row = ctk.CTkFrame(pid_frame, bg_color="#212121")
+    pid_row.pack(fill="x", padx=6, pady=4)
+
+    pid_scale = ctk.CTkSlider(
+        pid_row,
+        from_=40,
+        to=75,
+        variable=pid_setpoint,
+        number_of_steps=35
+    )
+    pid_scale.pack(side="left", fill="x", expand=True)
+    style_slider_ctk(pid_scale)
+
+    pid_lbl = ctk.CTkLabel(
+        pid_row,
+        textvariable=pid_setpoint,
+        width=40,
+        font=("FiraMono Nerd Font", 18, "bold")
+    )
+    pid_lbl.pack(side="left", padx=12)
+
+    # Solo se envía en modo pid (fase1 lee "setpoint" del fan_state)
+    pid_scale.configure(
+        command=lambda val:
+            state_service.write_state(
+                {
+                    "mode": "pid",
+                    "target_pwm": None,
+                    "setpoint": int(float(val))
+                }
+            ) if mode_var.get() == "pid" else None
+    )
+
 
     # -----------------------------
     # ---------- Curva ----------
     # -----------------------------
+    # Copia editable de las curvas de los dos ventiladores; fan1 parte de la
+    # curva lenta de caja si aún no tiene una propia.
+    fan_curves = curve_logic.curves()
+    curve_edit = {
+        "fan0": list(fan_curves["fan0"].curve.points),
+        "fan1": list(fan_curves["fan1"].curve.points) if "fan1" in fan_curves else list(DEFAULT_CASE_CURVE),
+    }
+    curve_shown = ["fan0"]
+    curve_fan_var = tk.StringVar(value="fan0")
+    fan1_sensor_var = tk.StringVar(value=fan_curves["fan1"].sensor if "fan1" in fan_curves else "fan0")
+
+    curve_head = ctk.CTkFrame(top, bg_color="#212121")
+    curve_head.pack(fill="x", pady=(4, 0))
+    sensor_row = ctk.CTkFrame(curve_head, bg_color="#212121")
+
     # Frame principal (antes LabelFrame)
     curve_frame = ctk.CTkFrame(top, bg_color="#212121")
     curve_frame.pack(fill="both", expand=True, pady=4)
@@ -721,59 +876,111 @@ def open_fan_control():
     curve_canvas.create_window((0,0), window=curve_inner, anchor="nw", width=DSI_WIDTH-50)
     curve_inner.bind("<Configure>", lambda e: curve_canvas.configure(scrollregion=curve_canvas.bbox("all")))
     
-    # Contenido dinámico
-    curve_vars.clear()
-
-    for p in curve_logic.load_curve():
-
-        row = ctk.CTkFrame(curve_inner)
-        row.pack(fill="x", pady=6, padx=6, )
-
-        ctk.CTkLabel(
-            row,
-            text=f'{p["temp"]}°C',
-            width=50,
-            font=("FiraMono Nerd Font", 18, "bold")
-        ).pack(side="left")
-
-        var = tk.IntVar(value=p["pwm"])
-
-        ctk.CTkLabel(
-            row,
-            textvariable=var,
-            width=40,
-            font=("FiraMono Nerd Font", 18, "bold")
-        ).pack(side="right")
-
-        scale = ctk.CTkSlider(
-            row,
-            from_=0,
-            to=255,
-            variable=var,
-            number_of_steps=255,
-            height=40,
-            #width=800-155
+    # Contenido dinámico: los sliders del ventilador elegido
+    def build_curve_rows(points):
+        for child in curve_inner.winfo_children():
+            child.destroy()
+        curve_vars.clear()
+
+        for p in points:
+
+            row = ctk.CTkFrame(curve_inner)
+            row.pack(fill="x", pady=6, padx=6, )
+
+            ctk.CTkLabel(
+                row,
+                text=f'{p["temp"]}°C',
+                width=50,
+                font=("FiraMono Nerd Font", 18, "bold")
+            ).pack(side="left")
+
+            var = tk.IntVar(value=p["pwm"])
+
+            ctk.CTkLabel(
+                row,
+                textvariable=var,
+                width=40,
+                font=("FiraMono Nerd Font", 18, "bold")
+            ).pack(side="right")
+
+            scale = ctk.CTkSlider(
+                row,
+                from_=0,
+                to=255,
+                variable=var,
+                number_of_steps=255,
+                height=40,
+                #width=800-155
+            )
+            scale.pack(side="left", fill="x", expand=True, padx=6)
+
+            style_slider_ctk(scale)   # usa la versión CTk que te pasé antes
+
+            curve_vars.append((p["temp"], var))
+
+    def sync_curve_edit():
+        """Pasa los sliders visibles a la copia editable de su ventilador"""
+        curve_edit[curve_shown[0]] = [{"temp":t,"pwm":v.get()} for t,v in curve_vars]
+
+    def show_curve():
+        sync_curve_edit()
+        fan = curve_fan_var.get()
+        curve_shown[0] = fan
+        build_curve_rows(curve_edit[fan])
+        if fan == "fan1":
+            sensor_row.pack(side="right", padx=6)
+        else:
+            sensor_row.pack_forget()
+
+    for fan, label in (("fan0", "FAN0 CPU"), ("fan1", "FAN1 CAJA")):
+        rb = ctk.CTkRadioButton(
+            curve_head,
+            text=label,
+            variable=curve_fan_var,
+            value=fan,
+            command=show_curve,
         )
-        scale.pack(side="left", fill="x", expand=True, padx=6)
+        rb.pack(side="left", padx=6)
+        style_radiobutton_ctk(rb)
 
-        style_slider_ctk(scale)   # usa la versión CTk que te pasé antes
+    ctk.CTkLabel(
+        sensor_row,
+        text="Sensor",
+        font=("FiraMono Nerd Font", 18, "bold")
+    ).pack(side="left", padx=6)
+    # "fan0": sin curva propia, la caja sigue al disipador
+    for sensor, label in (("fan0", "=FAN0"), ("chassis", "CHASIS"), ("nvme", "NVME")):
+        rb = ctk.CTkRadioButton(
+            sensor_row,
+            text=label,
+            variable=fan1_sensor_var,
+            value=sensor,
+        )
+        rb.pack(side="left", padx=6)
+        style_radiobutton_ctk(rb)
 
-        curve_vars.append((p["temp"], var))
+    build_curve_rows(curve_edit["fan0"])
 
     # -----------------------------
     # ---------- Actions ----------
     # -----------------------------
     actions = ctk.CTkFrame(bottom); actions.pack(fill="x", pady=4)
 
+    def curve_document():
+        sync_curve_edit()
+        data = {"points": curve_edit["fan0"]}
+        if fan1_sensor_var.get() != "fan0":
+            data["fan1"] = {"sensor": fan1_sensor_var.get(), "points": curve_edit["fan1"]}
+        return data
+
     def save_curve():
-        """Guarda los sliders actuales en el archivo JSON"""
-        data = {"points":[{"temp":t,"pwm":v.get()} for t,v in curve_vars]}
-        with open(CURVE_FILE, "w") as f: json.dump(data, f, indent=2)
+        """Guarda las curvas de los dos ventiladores en el archivo JSON"""
+        state_service.write_curve(curve_document())
         custom_msgbox(root, "Curva guardada correctamente", "Guardado")
 
     def restore_default():
-        """Restaura la curva por defecto y actualiza sliders"""
-        default = [
+        """Restaura la curva por defecto del ventilador visible y actualiza sliders"""
+        default = list(DEFAULT_CASE_CURVE) if curve_shown[0] == "fan1" else [
             {
             "temp": 20,
             "pwm": 20
@@ -811,14 +1018,52 @@ def open_fan_control():
             "pwm": 255
             }
         ]
-        with open(CURVE_FILE, "w") as f: json.dump({"points":default}, f, indent=2)
-        # --- Actualizamos los sliders para reflejar la curva por defecto ---
-        for t_var, (t, var) in zip(default, curve_vars):
-            var.set(t_var["pwm"])
+        # --- Reconstruimos los sliders con la curva por defecto ---
+        build_curve_rows(default)
+        state_service.write_curve(curve_document())
         custom_msgbox(root, "Curva restaurada por defecto", "Restaurado")
 
+    def show_tuned_curve():
+        """Recoge la propuesta del ajuste y la deja en los sliders de fan0 para revisarla"""
+        if not control_fan_win.winfo_exists():
+            return
+        result = curve_tuner_service.get_result()
+        if result["status"] == "running":
+            control_fan_win.after(250, show_tuned_curve)
+            return
+        if result["status"] == "error":
+            custom_msgbox(root, f"Error ajustando la curva: {result['error']}", "Ajuste")
+            return
+        tuned = result["tune"]
+        sync_curve_edit()
+        curve_edit["fan0"] = tuned.points
+        curve_shown[0] = "fan0"
+        curve_fan_var.set("fan0")
+        sensor_row.pack_forget()
+        build_curve_rows(tuned.points)
+        now, new = tuned.baseline, tuned.predicted
+        custom_msgbox(
+            root,
+            f"Pico {now.peak_temp:.1f} -> {new.peak_temp:.1f} °C, "
+            f">{TEMP_WARN}°C {now.time_warn:.0f} -> {new.time_warn:.0f} s\n"
+            f"PWM medio {now.mean_pwm:.0f} -> {new.mean_pwm:.0f}"
+            + ("" if tuned.feasible else "\nNinguna curva cumple el límite") +
+            "\nPulsa Guardar curva para aplicarla",
+            "Curva propuesta"
+        )
+
+    def tune_curve():
+        """Propone una curva de fan0 a partir de la traza que graba fase1"""
+        if not curve_tuner_service.available():
+            custom_msgbox(root, "No hay traza grabada (FAN_TRACE_FILE en settings)", "Ajuste")
+            return
+        sync_curve_edit()
+        curve_tuner_service.start(current=curve_edit["fan0"])
+        control_fan_win.after(250, show_tuned_curve)
+
     make_futuristic_button(actions,"Guardar curva", save_curve).pack(side="left", padx=10)
     make_futuristic_button(actions,"Restaurar por defecto", restore_default).pack(side="left", padx=10)
+    make_futuristic_button(actions,"Ajustar curva", tune_curve).pack(side="left", padx=10)
     make_futuristic_button(actions, "Cerrar", lambda: control_fan_win.destroy(), width=20).pack(side="right", padx=10)
 
 #make_futuristic_button(line_1, "Control Ventiladores",font_size=18 , command=open_fan_control).pack(side="left", padx=10)
@@ -836,6 +1081,8 @@ def open_monitor_window():
     global disk_lbl, disk_val, disk_cvs, disk_lines
     global disk_write_lvl, disk_write_val, disk_read_lvl, disk_read_val, disk_write_lines, disk_read_lines, disk_write_cvs, disk_read_cvs
     global disk_temp_lvl, disk_temp_val, disk_temp_lines, disk_temp_cvs
+    global freq_lbl, freq_val, freq_cvs, freq_lines, throttle_lbl, throttle_val, throttle_cvs, throttle_lines
+    global monitor_hw_blocks
     if monitor_win and monitor_win.winfo_exists():
         monitor_win.lift()
         return
@@ -875,6 +1122,19 @@ def open_monitor_window():
     ram_lines  = init_graph_lines(ram_cvs, HISTORY, ram_lbl.cget("text_color"))
     temp_lines = init_graph_lines(temp_cvs, HISTORY, temp_lbl.cget("text_color"))
 
+    # --- Bloques por core ---
+    cpu_core_blocks.clear()
+    for i in range(len(cpu_core_hist)):
+        core_lbl, core_val, core_cvs = make_block_ctk(hw_inner, f"CPU{i} %")
+        core_lines = init_graph_lines(core_cvs, HISTORY, core_lbl.cget("text_color"))
+        cpu_core_blocks.append((core_lbl, core_val, core_cvs, core_lines))
+
+    # --- Frecuencia y throttling ---
+    freq_lbl, freq_val, freq_cvs = make_block_ctk(hw_inner, "CPU FREQ MHz")
+    freq_lines = init_graph_lines(freq_cvs, HISTORY, freq_lbl.cget("text_color"))
+    throttle_lbl, throttle_val, throttle_cvs = make_block_ctk(hw_inner, "THROTTLING")
+    throttle_lines = init_graph_lines(throttle_cvs, HISTORY, throttle_lbl.cget("text_color"))
+
     # --- Bloques disco ---
     disk_lbl, disk_val, disk_cvs = make_block_ctk(hw_inner, "DISK %")
     disk_lines = init_graph_lines(disk_cvs, HISTORY, disk_lbl.cget("text_color"))
@@ -886,6 +1146,16 @@ def open_monitor_window():
 
     disk_temp_lvl, disk_temp_val, disk_temp_cvs = make_block_ctk(hw_inner, "DISK TEMP °C")
     disk_temp_lines = init_graph_lines(disk_temp_cvs, HISTORY, disk_temp_lvl.cget("text_color"))
+
+    # --- Chasis y ventiladores (lo que fase1 lee de la placa) ---
+    monitor_hw_blocks = make_hw_blocks(hw_inner)
+
+    metrics_sampler.subscriptions.bind_window(
+        monitor_win, "monitor", {"cpu", "freq", "throttle", "ram", "temp", "disk_io", "hw"}, SAMPLER_INTERVAL
+    )
+    metrics_sampler.subscriptions.bind_window(
+        monitor_win, "monitor_slow", {"disk", "disk_temp"}, SLOW_SAMPLER_INTERVAL
+    )
     # --- Sección inferior ---
     section_bottom = ctk.CTkFrame(main_frame)
     section_bottom.pack(fill="x")
@@ -1000,6 +1270,8 @@ def open_net_window():
 
     make_futuristic_button(bottom, "Cerrar", lambda: net_win.destroy()).pack(side="right", padx=10)
 
+    metrics_sampler.subscriptions.bind_window(net_win, "net", {"net"}, SAMPLER_INTERVAL)
+
 #make_futuristic_button(line_1, "Monitor Red", open_net_window).pack(side="left", padx=10)
 
 def open_usb_window():
@@ -1052,9 +1324,67 @@ def open_usb_window():
 
     # Carga inicial
     refresh_usb_devices()
+    metrics_sampler.subscriptions.bind_window(usb_win, "usb", {"usb"}, USB_SAMPLER_INTERVAL)
 
 #make_futuristic_button(line_2, "Monitor USB", open_usb_window).pack(side="left", padx=10)
 
+def open_process_window():
+    """
+    Abre la ventana de procesos (top por CPU y por RAM).
+    """
+    global proc_win
+
+    if proc_win and proc_win.winfo_exists():
+        proc_win.lift()
+        return
+
+    proc_win = ctk.CTkToplevel(root)
+    proc_win.title("Procesos")
+    proc_win.configure(bg="#212121")
+    proc_win.overrideredirect(True)
+    proc_win.geometry(f"{DSI_WIDTH}x{DSI_HEIGHT}+{DSI_X}+{DSI_Y}")
+    proc_win.resizable(False, False)
+
+    main_frame = ctk.CTkFrame(proc_win, bg_color="#212121")
+    main_frame.pack(fill="both", expand=True)
+    proc_section = ctk.CTkFrame(main_frame, bg_color="#212121")
+    proc_section.pack(fill="both", expand=True, pady=5)
+
+    proc_canvas = ctk.CTkCanvas(proc_section, bg="#212121", highlightthickness=0)
+    proc_canvas.pack(side="left", fill="both", expand=True)
+    proc_scrollbar = ctk.CTkScrollbar(proc_section, orientation="vertical", command=proc_canvas.yview, width=30)
+    proc_scrollbar.pack(side="right", fill="y")
+    style_scrollbar_ctk(proc_scrollbar)
+    proc_canvas.configure(yscrollcommand=proc_scrollbar.set)
+
+    proc_inner = ctk.CTkFrame(proc_canvas, bg_color="#212121")
+    proc_canvas.create_window((0,0), window=proc_inner, anchor="nw", width=DSI_WIDTH-35)
+    proc_inner.bind("<Configure>", lambda e: proc_canvas.configure(scrollregion=proc_canvas.bbox("all")))
+
+    proc_cpu_rows.clear()
+    proc_rss_rows.clear()
+    for title, rows in (("Top CPU:", proc_cpu_rows), ("Top RAM:", proc_rss_rows)):
+        ctk.CTkLabel(proc_inner, text=title, text_color="#14611E", bg_color="#212121",
+                     font=("FiraMono Nerd Font", 25, "bold")).pack(anchor="w", pady=(10, 5))
+        for _ in range(PROC_TOP_N):
+            lbl = ctk.CTkLabel(proc_inner, text="", text_color="#00ffff", bg_color="#212121",
+                               font=("FiraMono Nerd Font", 18), anchor="w", width=DSI_WIDTH-60)
+            lbl.pack(anchor="w")
+            rows.append(lbl)
+
+    bottom_frame = ctk.CTkFrame(main_frame, bg_color="#212121")
+    bottom_frame.pack(fill="x", pady=6, padx=8)
+    make_futuristic_button(bottom_frame, "Cerrar", proc_win.destroy).pack(side="right", padx=10)
+
+    metrics_sampler.subscriptions.bind_window(proc_win, "procs", {"procs"}, PROC_SAMPLER_INTERVAL)
+
+def render_process_rows(rows, processes):
+    for lbl, p in zip(rows, processes):
+        text = f"{p.pid:>7}  {p.name[:16]:<16} {p.cpu:5.1f} %  {p.rss_mb:7.1f} MB"
+        lbl.configure(text=text, text_color=level_color(p.cpu, CPU_WARN, CPU_CRIT))
+    for lbl in rows[len(processes):]:
+        lbl.configure(text="")
+
 def run_script(script_path):
     def _run():
         try:
@@ -1150,6 +1480,7 @@ botones_menu = [
     ("Monitor Placa", open_monitor_window),
     ("Monitor Red", open_net_window),
     ("Monitor USB", open_usb_window),
+    ("Procesos", open_process_window),
     ("Lanzadores", open_lanzadores),
 ]
 
@@ -1177,44 +1508,35 @@ for c in range(columnas):
 # ---------- Update loop ----------
 # -----------------------------
 def update():
-    global last_state, last_disk_io, last_net_io, last_used_iface, net_dynamic_max, net_idle_counter, disk_read_dynamic_max,disk_write_dynamic_max, disk_idle_counter
+    global last_state, last_state_version, last_disk_io, last_net_io, last_used_iface, net_dynamic_max, net_idle_counter, disk_read_dynamic_max,disk_write_dynamic_max, disk_idle_counter
 
-    # --- Cargar estado ---
+    # --- Cargar estado (solo si su secuencia ha cambiado) ---
     try:
-        st = state_service.load_state()
-        if st != last_state:
-            last_state = st
-            mode_var.set(st.get("mode","auto"))
-            tp = st.get("target_pwm")
-            if isinstance(tp,int): manual_pwm.set(tp)
+        version = state_service.version()
+        if version != last_state_version:
+            st = state_service.load_state()
+            last_state_version = version
+            if st != last_state:
+                last_state = st
+                mode_var.set(st.get("mode","auto"))
+                tp = st.get("target_pwm")
+                if isinstance(tp,int): manual_pwm.set(tp)
+                sp = st.get("setpoint")
+                if isinstance(sp,(int,float)): pid_setpoint.set(int(sp))
     except: pass
 
-    # --- Lecturas del sistema ---
-    cpu = system_metrics.get_cpu_usage()
-    ram = system_metrics.get_ram_usage()
-    temp = system_metrics.get_cpu_temp()
-    disk = system_metrics.get_disk_usage()
-    disk_io = system_metrics.get_disk_io()
-    disk_read = disk_io["read_mb"]
-    disk_write = disk_io["write_mb"]
-    disk_temp = system_metrics.get_disk_temp()
-
-    # --- Gestión PWM ---
-    try:
-        st = state_service.load_state()
-        mode = st.get("mode","auto"); current_target = st.get("target_pwm")
-        if mode=="manual":
-            desired = int(current_target) if isinstance(current_target,int) else int(manual_pwm.get())
-        elif mode=="auto":
-            desired = curve_logic.compute_pwm(temp)
-        elif mode=="silent": desired=77
-        elif mode=="normal": desired=128
-        elif mode=="performance": desired=255
-        else: desired = curve_logic.compute_pwm(temp)
-        desired = max(0, min(255, int(desired)))
-        if desired != current_target:
-            state_service.write_state({"mode":mode,"target_pwm":desired})
-    except: pass
+    # --- Lecturas del sistema (última foto del hilo de muestreo) ---
+    snap = metrics_sampler.get_snapshot()
+    if snap is None:
+        root.after(UPDATE_MS, update)
+        return
+    cpu = snap.cpu
+    ram = snap.ram
+    temp = snap.temp
+    disk = snap.disk
+    disk_read = snap.disk_read
+    disk_write = snap.disk_write
+    disk_temp = snap.disk_temp
 
     # --- Actualizar ventana monitor si existe ---
     if monitor_win and monitor_win.winfo_exists():
@@ -1232,8 +1554,37 @@ def update():
         ram_lbl.configure(text_color=ram_c); ram_val.configure(text=f"{ram:4.0f} %", text_color=ram_c)
         temp_lbl.configure(text_color=tmp_c); temp_val.configure(text=f"{temp:4.1f} °C", text_color=tmp_c)
 
+        # --- Por core (user/system/iowait/steal de la misma lectura) ---
+        for (core_lbl, core_val, core_cvs, core_lines), hist, core in zip(cpu_core_blocks, cpu_core_hist, snap.cpu_cores):
+            hist.append(core.busy)
+            core_c = level_color(core.busy, CPU_WARN, CPU_CRIT)
+            recolor_lines(core_cvs, core_lines, core_c)
+            update_graph_lines(core_cvs, core_lines, hist, 100)
+            core_lbl.configure(text_color=core_c)
+            core_val.configure(
+                text=f"{core.busy:4.0f} % | usr {core.user:.0f} sys {core.system:.0f} io {core.iowait:.0f} st {core.steal:.0f}",
+                text_color=core_c
+            )
+
+        # --- Frecuencia y throttling ---
+        freq = max(snap.cpu_freq) if snap.cpu_freq else 0.0
+        freq_max = system_metrics.get_cpu_max_freq() or max(freq, 1.0)
+        level = throttle_level(snap.throttle)
+        freq_hist.append(freq)
+        throttle_hist.append(level)
+        # La frecuencia baja sola en reposo: el color lo marca el throttling, no el MHz
+        throttle_c = level_color(level, 1, 2)
+        freq_c = throttle_c
+        recolor_lines(freq_cvs, freq_lines, freq_c)
+        recolor_lines(throttle_cvs, throttle_lines, throttle_c)
+        update_graph_lines(freq_cvs, freq_lines, freq_hist, freq_max)
+        update_graph_lines(throttle_cvs, throttle_lines, throttle_hist, 3)
+        freq_lbl.configure(text_color=freq_c)
+        freq_val.configure(text=f"{freq:.0f} / {freq_max:.0f} MHz", text_color=freq_c)
+        throttle_lbl.configure(text_color=throttle_c)
+        throttle_val.configure(text=throttle_text(snap.throttle), text_color=throttle_c)
+
         # --- Disco ---
-        disk = system_metrics.get_disk_usage()
         disk_hist.append(disk)
         disk_c = level_color(disk, 60, 80)
         recolor_lines(disk_cvs, disk_lines, disk_c)
@@ -1259,25 +1610,39 @@ def update():
         disk_read_lvl.configure(text_color=read_c)
         disk_write_val.configure(text=f"{disk_write_mb:.1f} MB/s", text_color=write_c)
         disk_read_val.configure(text=f"{disk_read_mb:.1f} MB/s", text_color=read_c)
-        disk_temp_celsius = system_metrics.get_disk_temp()
+        disk_temp_celsius = disk_temp
         disk_temp_hist.append(disk_temp_celsius)
-        disk_temp_c = level_color(disk_temp, TEMP_WARN, TEMP_CRIT)
+        disk_temp_c = level_color(disk_temp_celsius, TEMP_WARN, TEMP_CRIT)
         recolor_lines(disk_temp_cvs, disk_temp_lines, disk_temp_c)
-        update_graph_lines(disk_temp_cvs, disk_read_lines, disk_temp_hist, 85)
+        update_graph_lines(disk_temp_cvs, disk_temp_lines, disk_temp_hist, 85)
         disk_temp_lvl.configure(text_color=disk_temp_c)
-        disk_temp_val.configure(text=f"{disk_temp_celsius} °C", text_color=disk_temp_c)
-    if net_win and net_win.winfo_exists():
-        net_data = network_service.get_network_delta()
+        disk_temp_val.configure(text=f"{disk_temp_celsius:.0f} °C", text_color=disk_temp_c)
+    # --- Estado real de la placa (monitor y ventana de ventiladores) ---
+    monitor_open = monitor_win and monitor_win.winfo_exists()
+    fan_open = control_fan_win and control_fan_win.winfo_exists()
+    if monitor_open or fan_open:
+        hw = snap.hardware
+        if hw is not None and not hw.stale:
+            chassis_hist.append(hw.chassis_temp)
+            fan0_real_hist.append(hw.fan0_pct)
+            fan1_real_hist.append(hw.fan1_pct)
+        if monitor_open:
+            render_hw_blocks(monitor_hw_blocks, hw)
+        if fan_open:
+            render_hw_blocks(fan_hw_blocks, hw)
+
+    if proc_win and proc_win.winfo_exists() and snap.processes is not None:
+        top_cpu, top_rss = snap.processes
+        render_process_rows(proc_cpu_rows, top_cpu)
+        render_process_rows(proc_rss_rows, top_rss)
 
-        dl = network_metrics.compute_speed(
-            net_data["download_bytes"],
-            net_data["delta_time"]
-        )
+    if usb_win and usb_win.winfo_exists():
+        if snap.usb_devices is not None and snap.usb_devices != last_usb_devices:
+            refresh_usb_devices(snap.usb_devices)
 
-        ul = network_metrics.compute_speed(
-            net_data["upload_bytes"],
-            net_data["delta_time"]
-        )
+    if net_win and net_win.winfo_exists():
+        dl = snap.net_dl
+        ul = snap.net_ul
 
         net_download_hist.append(dl)
         net_upload_hist.append(ul)
@@ -1286,7 +1651,7 @@ def update():
             max(dl, ul)
         )
 
-        iface = net_data["iface"]
+        iface = snap.net_iface
 
     
         recolor_lines(net_dl_cvs, net_dl_lines, net_color(dl))
@@ -1345,5 +1710,7 @@ def update():
 # -----------------------------
 # ---------- Inicio ----------
 # -----------------------------
+control_client.start()
+metrics_sampler.start()
 update()
 root.mainloop()
@@ -0,0 +1,44 @@
+import os
+import threading
+from config.settings import FAN_TRACE_FILE, TUNER_PERCENTILE
+from core.curve_tuner import tune_file
+
+
+class CurveTunerService:
+    """
+    Ajuste de la curva de fan0 en segundo plano (puede tardar unos segundos
+    con trazas largas). Mismo esquema que SpeedtestService: start() lanza el
+    hilo y get_result() devuelve el estado ("idle", "running", "done",
+    "error") con la propuesta o el mensaje de error.
+    """
+
+    def __init__(self, trace_path=FAN_TRACE_FILE, percentile=TUNER_PERCENTILE):
+        self.trace_path = trace_path
+        self.percentile = percentile
+        self._running = False
+        self._result = {"status": "idle", "tune": None, "error": None}
+
+    def get_result(self):
+        return self._result
+
+    def is_running(self):
+        return self._running
+
+    def available(self):
+        return bool(self.trace_path) and os.path.exists(self.trace_path)
+
+    def start(self, current=None):
+        if self._running:
+            return
+        self._running = True
+        self._result = {"status": "running", "tune": None, "error": None}
+        threading.Thread(target=self._run, args=(current,), daemon=True).start()
+
+    def _run(self, current):
+        try:
+            tuned = tune_file(self.trace_path, percentile=self.percentile, current=current)
+            self._result = {"status": "done", "tune": tuned, "error": None}
+        except Exception as e:
+            self._result = {"status": "error", "tune": None, "error": str(e)}
+        finally:
+            self._running = False
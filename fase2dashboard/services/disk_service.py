@@ -0,0 +1,98 @@
+import glob
+import os
+import re
+import subprocess
+import threading
+import time
+from config.settings import DISK_DEVICE, DISK_TEMP_TTL, DISK_SMART_INTERVAL
+from core.thermal_sensor import ThermalSensor
+
+
+class DiskService:
+    """
+    Temperatura del disco (NVMe o SATA) sin lanzar `sudo nvme smart-log`
+    en cada tick.
+
+    El sensor hwmon del disco se localiza una sola vez y se relee con pread.
+    Cada lectura se cachea `ttl` segundos para que todos los consumidores
+    de un mismo tick compartan el valor. Si el disco no expone hwmon se usa
+    smart-log, pero como mucho una vez cada `smart_interval` segundos.
+    """
+
+    def __init__(self, device=DISK_DEVICE, ttl=DISK_TEMP_TTL, smart_interval=DISK_SMART_INTERVAL):
+        self.device = device
+        self.ttl = ttl
+        self.smart_interval = smart_interval
+
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._value_ts = None
+        self._last_smart = None
+
+        self._sensor = None
+        path = self._find_hwmon_input()
+        if path:
+            sensor = ThermalSensor(path)
+            if sensor.backend == "sysfs":
+                self._sensor = sensor
+
+    def _find_hwmon_input(self):
+        """temp1_input del disco: /sys/class/nvme/<ctrl>/hwmon*/ o el del bloque (drivetemp)."""
+        name = os.path.basename(self.device)
+        patterns = []
+
+        match = re.match(r"(nvme\d+)", name)
+        if match:
+            ctrl = match.group(1)
+            patterns += [
+                f"/sys/class/nvme/{ctrl}/hwmon*/temp1_input",
+                f"/sys/class/nvme/{ctrl}/device/hwmon/hwmon*/temp1_input",
+            ]
+        patterns += [
+            f"/sys/block/{name}/device/hwmon*/temp1_input",
+            f"/sys/block/{name}/device/hwmon/hwmon*/temp1_input",
+        ]
+
+        for pattern in patterns:
+            found = sorted(glob.glob(pattern))
+            if found:
+                return found[0]
+        return None
+
+    @property
+    def backend(self):
+        return "hwmon" if self._sensor else "smart-log"
+
+    def _read_smart(self):
+        out = subprocess.check_output(
+            ["sudo", "nvme", "smart-log", self.device],
+            stderr=subprocess.DEVNULL
+        ).decode()
+
+        # Buscar temperatura en formato "33°C"
+        match = re.search(r"temperature\s*:\s*(\d+)\s*°C", out, re.IGNORECASE)
+        if match:
+            return float(match.group(1))
+        return 0.0
+
+    def get_temp(self):
+        """Temperatura en °C (0.0 si no hay lectura disponible)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._value_ts is not None and now - self._value_ts < self.ttl:
+                return self._value
+
+            if self._sensor:
+                try:
+                    self._value = self._sensor.read_sysfs()
+                except (OSError, ValueError):
+                    self._value = 0.0
+            elif self._last_smart is None or now - self._last_smart >= self.smart_interval:
+                self._last_smart = now
+                try:
+                    self._value = self._read_smart()
+                except Exception:
+                    self._value = 0.0
+
+            self._value_ts = now
+            return self._value
@@ -0,0 +1,47 @@
+from collections import namedtuple
+from config.settings import HW_STATE_PERIOD, HW_STALE_FACTOR
+from core.state_store import runtime_store, HW_STATE
+
+
+# Lo que fase1 lee de la placa por I2C: temperatura del chasis y el duty
+# real (en %) de cada ventilador. `age` son los segundos desde la última
+# escritura de fase1 (None si nunca ha escrito) y `stale` se activa cuando
+# supera HW_STALE_FACTOR veces su periodo. fan_fault es el fallo de
+# refrigeración que ha detectado fase1 (None si todo va bien).
+HardwareState = namedtuple("HardwareState", [
+    "chassis_temp",
+    "fan0_pct",
+    "fan1_pct",
+    "age",
+    "stale",
+    "fan_fault",
+])
+
+
+class HardwareStateService:
+    """
+    Lector cacheado de hardware_state.json.
+
+    Usa la cabecera con secuencia del almacén de estado: mientras fase1 no
+    vuelva a escribir solo se leen 34 bytes y se devuelve lo ya decodificado.
+    """
+
+    def __init__(self, store=None, period=HW_STATE_PERIOD, stale_factor=HW_STALE_FACTOR):
+        self._reader = (store or runtime_store()).reader(HW_STATE, default={})
+        self.max_age = period * stale_factor
+
+    def get(self):
+        doc = self._reader.get()
+        data = doc.data if isinstance(doc.data, dict) else {}
+        age = self._reader.age()
+        try:
+            return HardwareState(
+                chassis_temp=float(data.get("chassis_temp", 0)),
+                fan0_pct=float(data.get("fan0_pct", 0)),
+                fan1_pct=float(data.get("fan1_pct", 0)),
+                age=age,
+                stale=age is None or age > self.max_age,
+                fan_fault=data.get("fan_fault") or None,
+            )
+        except (TypeError, ValueError):
+            return HardwareState(0.0, 0.0, 0.0, age, True, None)
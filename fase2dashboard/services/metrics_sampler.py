@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import namedtuple
+from core.subscriptions import MetricSubscriptions
+
+
+# Foto inmutable de todas las lecturas de un ciclo de muestreo.
+# Las velocidades de disco y red van en MB/s; cpu_detail y cpu_cores son
+# CpuTimes (total y por core) de la misma lectura de /proc/stat; cpu_freq
+# va en MHz por core y throttle es un ThrottleState (o None). hardware es
+# el HardwareState que publica fase1 (o None sin servicio).
+# Las métricas sin suscriptores conservan su último valor.
+MetricsSnapshot = namedtuple("MetricsSnapshot", [
+    "ts",
+    "cpu",
+    "cpu_detail",
+    "cpu_cores",
+    "cpu_freq",
+    "throttle",
+    "ram",
+    "temp",
+    "disk",
+    "disk_read",
+    "disk_write",
+    "disk_temp",
+    "net_iface",
+    "net_dl",
+    "net_ul",
+    "usb_devices",
+    "processes",
+    "hardware",
+])
+
+# Colectores disponibles (nombres usados al suscribirse)
+COLLECTORS = ("cpu", "freq", "throttle", "ram", "temp", "disk", "disk_io", "disk_temp", "net", "usb", "procs", "hw")
+
+# Sin ningún suscriptor el hilo solo comprueba cada tanto si alguien se ha apuntado
+IDLE_WAIT = 5.0
+
+
+class MetricsSampler:
+    """
+    Hilo que muestrea los sensores fuera del hilo de Tk.
+
+    Solo se ejecutan los colectores que tienen algún suscriptor en
+    `subscriptions`, cada uno al intervalo del suscriptor más exigente. Con
+    cada ronda se publica un MetricsSnapshot sustituyendo la referencia
+    anterior; el hilo de la UI solo lee la última foto, así que una lectura
+    lenta (vcgencmd, nvme...) nunca bloquea el redibujado ni la entrada táctil.
+
+    Si hay un `bus_reader` y fase1 ha publicado hace menos de `bus_max_age`
+    segundos, CPU, RAM y temperatura se toman del bus compartido en lugar
+    de volver a muestrearlas aquí.
+    """
+
+    def __init__(self, system_metrics, network_service, network_metrics, interval=1.0,
+                 bus_reader=None, bus_max_age=3.0, usb_service=None, hardware_service=None):
+        self._system_metrics = system_metrics
+        self._network_service = network_service
+        self._network_metrics = network_metrics
+        self._usb_service = usb_service
+        self._hardware_service = hardware_service
+        self._bus_reader = bus_reader
+        self.bus_max_age = bus_max_age
+        self.interval = interval
+
+        self._wake_event = threading.Event()
+        self.subscriptions = MetricSubscriptions(on_change=self._wake_event.set)
+
+        self._values = {
+            "cpu": 0.0, "cpu_detail": None, "cpu_cores": (),
+            "cpu_freq": (), "throttle": None,
+            "ram": 0.0, "temp": 0.0, "disk": 0.0,
+            "disk_read": 0.0, "disk_write": 0.0, "disk_temp": 0.0,
+            "net_iface": "N/A", "net_dl": 0.0, "net_ul": 0.0,
+            "usb_devices": None,
+            "processes": None,
+            "hardware": None,
+        }
+        self._last_run = {}        # colector -> time.monotonic() de la última ejecución
+        self.collector_runs = {name: 0 for name in COLLECTORS}
+
+        self._snapshot = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def get_snapshot(self):
+        """Última foto publicada (None hasta el primer muestreo)."""
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.clear()
+            try:
+                wait = self._sample()
+            except Exception as e:
+                print(f"[sampler] Error muestreando: {e}")
+                wait = self.interval
+            self._wake_event.wait(wait)
+
+    def _due(self, now):
+        """Colectores que tocan ahora y segundos hasta el siguiente vencimiento."""
+        due = set()
+        next_wait = IDLE_WAIT
+        for name, interval in self.subscriptions.intervals().items():
+            last = self._last_run.get(name)
+            if last is None or now - last >= interval:
+                due.add(name)
+                next_wait = min(next_wait, interval)
+            else:
+                next_wait = min(next_wait, interval - (now - last))
+        return due, next_wait
+
+    def _sample(self):
+        now = time.monotonic()
+        due, next_wait = self._due(now)
+        if not due:
+            return next_wait
+
+        sm = self._system_metrics
+        v = self._values
+
+        bus = None
+        if self._bus_reader and due & {"cpu", "ram", "temp"}:
+            bus = self._bus_reader.read_fresh(self.bus_max_age)
+
+        if "cpu" in due:
+            if bus:
+                cpu_total, cpu_cores = bus.cpu_detail, bus.cpu_cores
+            else:
+                cpu_total, cpu_cores = sm.get_cpu_times()
+            v["cpu"], v["cpu_detail"], v["cpu_cores"] = cpu_total.busy, cpu_total, cpu_cores
+        if "freq" in due:
+            v["cpu_freq"] = sm.get_cpu_freq()
+        if "throttle" in due:
+            v["throttle"] = sm.get_throttle()
+        if "ram" in due:
+            v["ram"] = bus.ram if bus else sm.get_ram_usage()
+        if "temp" in due:
+            v["temp"] = bus.temp if bus else sm.get_cpu_temp()
+        if "disk" in due:
+            v["disk"] = sm.get_disk_usage()
+        if "disk_io" in due:
+            disk_io = sm.get_disk_io()
+            last = self._last_run.get("disk_io")
+            if last is None:
+                # Primera vez: el delta acumula desde el arranque, no es una velocidad
+                v["disk_read"] = v["disk_write"] = 0.0
+            else:
+                dt = max(now - last, 0.0001)
+                v["disk_read"] = disk_io["read_mb"] / dt
+                v["disk_write"] = disk_io["write_mb"] / dt
+        if "disk_temp" in due:
+            v["disk_temp"] = sm.get_disk_temp()
+        if "net" in due:
+            net_data = self._network_service.get_network_delta()
+            v["net_iface"] = net_data["iface"]
+            v["net_dl"] = self._network_metrics.compute_speed(net_data["download_bytes"], net_data["delta_time"])
+            v["net_ul"] = self._network_metrics.compute_speed(net_data["upload_bytes"], net_data["delta_time"])
+        if "usb" in due and self._usb_service:
+            storage, others = self._usb_service.list_all_usb_devices()
+            v["usb_devices"] = (storage, others)
+        if "procs" in due:
+            v["processes"] = sm.get_top_processes()
+        if "hw" in due and self._hardware_service:
+            v["hardware"] = self._hardware_service.get()
+
+        for name in due:
+            self._last_run[name] = now
+            if name in self.collector_runs:
+                self.collector_runs[name] += 1
+
+        self._snapshot = MetricsSnapshot(ts=time.time(), **v)
+        return next_wait
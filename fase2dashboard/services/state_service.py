@@ -1,25 +1,159 @@
+import atexit
 import json
-import os
-from config.settings import STATE_FILE
+import threading
+import time
+from config.settings import STATE_WRITE_COALESCE_S
+from core.file_watch import FileWatcher
+from core.state_store import runtime_store, config_store, FAN_STATE, FAN_CURVE
+
+# target_pwm solo lo usa el modo manual; el resto lo calcula fase1
+DEFAULT_STATE = {"mode": "auto", "target_pwm": None, "setpoint": None}
+
 
 class StateService:
+    """
+    Estado de los ventiladores (modo y PWM manual) y curva, con escritura diferida.
+
+    write_state/write_curve solo dejan el último valor pendiente y vuelven.
+    Un hilo espera a que la ráfaga se calme (`coalesce` segundos sin nuevas
+    escrituras, como mucho 4 veces eso) y entonces vuelca lo pendiente; un
+    payload idéntico byte a byte al último volcado no se escribe.
+    `writes_saved` cuenta las escrituras físicas evitadas.
+
+    Con un `channel` (ControlClient) conectado el estado va por el socket de
+    fase1, que lo aplica y persiste fan_state.json; el estado se lee de lo
+    último que fase1 ha empujado. Sin fase1 escuchando se usa el fichero,
+    que solo se vuelve a parsear cuando cambia.
+
+    fan_state.json vive en el almacén volátil (tmpfs) y fan_curve.json en
+    el duradero; cada almacén aplica su propia política de durabilidad.
+    """
+
+    def __init__(self, channel=None, watcher=None, coalesce=STATE_WRITE_COALESCE_S,
+                 runtime=None, config=None):
+        self._channel = channel
+        self._runtime = runtime or runtime_store()
+        self._config = config or config_store()
+        self._file = self._runtime.watch(watcher or FileWatcher(), FAN_STATE)
+        self.coalesce = coalesce
+
+        self._lock = threading.Lock()
+        self._pending = {}        # "fan" / "curve" -> datos
+        self._last_payload = {}   # "fan" / "curve" -> bytes del último volcado
+        self._latest = None       # último estado pedido (lectura de lo propio escrito)
+        self._latest_ts = 0.0
+        self._local_seq = 0       # sube con cada write_state de este proceso
+        self._last_request = 0.0
+        self.writes = 0
+        self.writes_saved = 0
+
+        self._wake_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    # -----------------------------
+    # ---------- Escritura ----------
+    # -----------------------------
+    def _queue(self, key, data):
+        with self._lock:
+            if key in self._pending:
+                self.writes_saved += 1     # sustituye a una escritura que no llegó a hacerse
+            self._pending[key] = data
+            self._last_request = time.monotonic()
+        self._wake_event.set()
 
     def write_state(self, data):
-        tmp = STATE_FILE + ".tmp"
-        with open(tmp, "w") as f:
-            json.dump(data, f)
-        os.replace(tmp, STATE_FILE)
+        with self._lock:
+            self._latest = dict(data)
+            self._latest_ts = time.monotonic()
+            self._local_seq += 1
+        self._queue("fan", dict(data))
 
-    def load_state(self):
-        try:
-            with open(STATE_FILE) as f:
-                data = json.load(f)
-                if not isinstance(data, dict):
-                    return {"mode": "auto", "target_pwm": None}
-                return {
-                    "mode": data.get("mode", "auto"),
-                    "target_pwm": data.get("target_pwm")
-                }
-        except:
-            return {"mode": "auto", "target_pwm": None}
+    def write_curve(self, data):
+        self._queue("curve", data)
+
+    def _run(self):
+        while True:
+            self._wake_event.wait()
+            self._wake_event.clear()
+            # Esperar a que la ráfaga termine, con un límite de latencia
+            started = time.monotonic()
+            while True:
+                with self._lock:
+                    quiet = time.monotonic() - self._last_request
+                if quiet >= self.coalesce or time.monotonic() - started >= self.coalesce * 4:
+                    break
+                time.sleep(self.coalesce - quiet if quiet < self.coalesce else 0)
+            self.flush()
+
+    def flush(self):
+        """Vuelca ya lo pendiente (también se llama al salir)."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for key, data in pending.items():
+            try:
+                self._write(key, data)
+            except Exception as e:
+                print(f"[state] Error guardando {key}: {e}")
 
+    def _write(self, key, data):
+        if key == "fan":
+            payload = json.dumps(data).encode()
+            pushed = self._channel.get_state("fan") if self._channel else None
+            if payload == self._last_payload.get(key) and (pushed is None or pushed == data):
+                self.writes_saved += 1
+                return
+            # _last_payload solo tras enviar/escribir: si falla, la misma
+            # petición se reintenta en vez de contarse como ahorrada
+            if self._channel and self._channel.send("fan", data):
+                self._last_payload[key] = payload
+                return
+            self._runtime.write_bytes(FAN_STATE, payload)
+        else:
+            payload = json.dumps(data, indent=2).encode()
+            if payload == self._last_payload.get(key):
+                self.writes_saved += 1
+                return
+            self._config.write_bytes(FAN_CURVE, payload)
+        self._last_payload[key] = payload
+        self.writes += 1
+
+    # -----------------------------
+    # ---------- Lectura ----------
+    # -----------------------------
+    def version(self):
+        """
+        Identificador barato del estado visible: cambia si hay una escritura
+        propia, un empuje de fase1 o una nueva secuencia en fan_state.json.
+        Permite saber si load_state() devolvería algo nuevo sin decodificarlo.
+        """
+        own = self._own_latest() is not None
+        pushed = self._channel.get_seq("fan") if self._channel else None
+        if pushed is not None:
+            return (self._local_seq, own, "socket", pushed)
+        header = self._runtime.header(FAN_STATE)
+        return (self._local_seq, own, "file", header[0] if header else None)
+
+    def _own_latest(self):
+        # Lo último escrito aquí manda mientras esté pendiente o fase1 aún no
+        # lo haya confirmado, para que update() no lo pise con el estado viejo.
+        with self._lock:
+            if self._latest is not None and "fan" not in self._pending \
+                    and time.monotonic() - self._latest_ts > self.coalesce * 4 + 2.0:
+                self._latest = None
+            return self._latest
+
+    def load_state(self):
+        data = self._own_latest()
+        if data is None and self._channel:
+            data = self._channel.get_state("fan")
+        if data is None:
+            data = self._file.get()
+        if not isinstance(data, dict):
+            return dict(DEFAULT_STATE)
+        return {
+            "mode": data.get("mode", "auto"),
+            "target_pwm": data.get("target_pwm"),
+            "setpoint": data.get("setpoint")
+        }